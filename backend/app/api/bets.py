@@ -1,7 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from ..config.supabase_setup import supabase
-from ..models.bets import BetCreate, BetResponse, BetContribution
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from ..config.supabase_setup import supabase, aexecute_with_admin
+from ..models.bets import (
+    BetCreate,
+    BetResponse,
+    BetContribution,
+    BetContributionBatch,
+    BetContributionBatchResponse
+)
 from typing import List, Optional
+import asyncio
+from ..utils.pagination import PageParams, fetch_page
+from ..utils.validators import BetValidator
+from ..utils.realtime import realtime_hub, sse_response
+from ..api.users import get_current_user, get_stream_user
+from ..api.groups import get_accessible_group, get_accessible_group_for_stream
+from ..utils.membership import membership_cache
 
 router = APIRouter(prefix="/bets", tags=["bets"])
 
@@ -10,8 +23,8 @@ async def create_one_to_many_bet(bet: BetCreate):
     try:
         bet_data = bet.dict()
         bet_data["bet_type"] = "one_to_many"
-        response = supabase.table('bets').insert(bet_data).execute()
-        return response.data[0]
+        response = await aexecute_with_admin(supabase.table('bets').insert(bet_data))
+        return response[0]
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -20,31 +33,65 @@ async def create_many_to_many_bet(bet: BetCreate):
     try:
         bet_data = bet.dict()
         bet_data["bet_type"] = "many_to_many"
-        response = supabase.table('bets').insert(bet_data).execute()
-        return response.data[0]
+        response = await aexecute_with_admin(supabase.table('bets').insert(bet_data))
+        return response[0]
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/group/{group_id}", response_model=List[BetResponse])
-async def get_bets_in_group(group_id: str):
+async def get_bets_in_group(group_id: str, response: Response, page: PageParams = Depends()):
     try:
-        response = supabase.table('bets')\
-            .select('*')\
-            .eq('group_id', group_id)\
-            .order('created_at', desc=True)\
-            .execute()
-        return response.data
+        bets, _ = await fetch_page(
+            supabase.table('bets')
+            .select('*')
+            .eq('group_id', group_id),
+            page,
+            response
+        )
+        return bets
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/group/{group_id}/stream")
+async def stream_group_bets(request: Request, group_id: str, group: dict = Depends(get_accessible_group_for_stream)):
+    """Server-Sent Events for bets created or updated in a group"""
+    subscription = await realtime_hub.subscribe(('bets', 'group_id', group_id))
+    return sse_response(request, subscription)
+
+@router.get("/{bet_id}/stream")
+async def stream_bet_updates(request: Request, bet_id: str, current_user: dict = Depends(get_stream_user)):
+    """Server-Sent Events for a bet's contributions and changes to the bet itself (totals, status)"""
+    try:
+        bet = await aexecute_with_admin(
+            supabase.table('bets')
+            .select('group_id')
+            .eq('id', bet_id)
+            .single()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not bet:
+        raise HTTPException(status_code=404, detail="Bet not found")
+    await get_accessible_group(bet['group_id'], current_user)
+
+    subscription = await realtime_hub.subscribe(
+        ('bet_contributions', 'bet_id', bet_id),
+        ('bets', 'id', bet_id)
+    )
+    return sse_response(request, subscription)
+
 @router.get("/active", response_model=List[BetResponse])
-async def get_active_bets():
+async def get_active_bets(response: Response, page: PageParams = Depends()):
     try:
-        response = supabase.table('bets')\
-            .select('*')\
-            .eq('status', 'active')\
-            .execute()
-        return response.data
+        bets, _ = await fetch_page(
+            supabase.table('bets')
+            .select('*')
+            .eq('status', 'active'),
+            page,
+            response
+        )
+        return bets
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -52,82 +99,156 @@ async def get_active_bets():
 async def contribute_to_bet(contribution: BetContribution):
     try:
         # First get current bet details
-        bet = supabase.table('bets')\
-            .select('*')\
-            .eq('id', contribution.bet_id)\
-            .single()\
-            .execute()
+        bet = await aexecute_with_admin(
+            supabase.table('bets')
+            .select('*')
+            .eq('id', contribution.bet_id)
+            .single()
+        )
             
-        if not bet.data:
+        if not bet:
             raise HTTPException(status_code=404, detail="Bet not found")
+
+        BetValidator.check_deadlines(bet)
             
         # Add contribution
-        response = supabase.table('bet_contributions').insert({
+        response = await aexecute_with_admin(supabase.table('bet_contributions').insert({
             "bet_id": contribution.bet_id,
             "user_id": "user_id",  # You'll get this from auth
             "quantity": contribution.quantity,
             "bet_side": contribution.bet_side
-        }).execute()
+        }))
         
-        return bet.data
+        return bet
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _contribution_error(contribution: BetContribution, bet: Optional[dict], memberships: dict) -> Optional[str]:
+    """Why a contribution in a batch can't be accepted, or None if it can"""
+    if not bet:
+        return "Bet not found"
+    if str(bet['group_id']) not in memberships:
+        return "Not a member of this bet's group"
+    if not bet.get('is_active', True) or bet.get('status') in ('expired', 'completed'):
+        return "Bet is closed"
+    if contribution.quantity <= 0:
+        return "Quantity must be positive"
+    if contribution.bet_side not in ('for', 'against'):
+        return "Invalid bet side"
+    try:
+        BetValidator.check_deadlines(bet)
+    except HTTPException as he:
+        return he.detail
+    return None
+
+@router.post("/contribute/batch", response_model=BetContributionBatchResponse)
+async def contribute_to_bets(batch: BetContributionBatch, current_user: dict = Depends(get_current_user)):
+    """
+    Add several contributions for the current user in one request.
+    Bets are checked with one query and the valid items written with one multi-row
+    insert; invalid items are reported per item and don't fail the batch.
+    """
+    try:
+        bet_ids = list(dict.fromkeys(c.bet_id for c in batch.contributions))
+        bets, memberships = await asyncio.gather(
+            aexecute_with_admin(
+                supabase.table('bets')
+                .select('id, group_id, status, is_active, verification_deadline')
+                .in_('id', bet_ids)
+            ),
+            membership_cache.memberships(current_user['id'])
+        )
+        bets_by_id = {str(bet['id']): bet for bet in (bets or [])}
+
+        results = []
+        rows = []
+        for index, contribution in enumerate(batch.contributions):
+            error = _contribution_error(contribution, bets_by_id.get(contribution.bet_id), memberships)
+            results.append({
+                "index": index,
+                "bet_id": contribution.bet_id,
+                "accepted": error is None,
+                "error": error
+            })
+            if error is None:
+                rows.append({
+                    "bet_id": contribution.bet_id,
+                    "user_id": current_user['id'],
+                    "quantity": contribution.quantity,
+                    "bet_side": contribution.bet_side
+                })
+
+        if not rows:
+            return {"results": results, "totals": []}
+
+        # Totals on the bet rows are updated by the statement-level bet_contributions trigger
+        created = await aexecute_with_admin(supabase.table('bet_contributions').insert(rows))
+        # PostgREST doesn't promise to return rows in insert order, so match them back
+        # on their values; identical items are interchangeable
+        pending = {}
+        for result, row in zip([result for result in results if result['accepted']], rows):
+            key = (str(row['bet_id']), row['bet_side'], row['quantity'])
+            pending.setdefault(key, []).append(result)
+        for row in created or []:
+            waiting = pending.get((str(row['bet_id']), row.get('bet_side'), row.get('quantity')))
+            if waiting:
+                waiting.pop(0)['contribution_id'] = str(row['id'])
+
+        totals = await aexecute_with_admin(
+            supabase.table('bets')
+            .select('id, current_total, total_for, total_against')
+            .in_('id', list(dict.fromkeys(row['bet_id'] for row in rows)))
+        )
+
+        return {"results": results, "totals": totals or []}
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{bet_id}", response_model=BetResponse)
 async def get_bet_by_id(bet_id: str):
     try:
-        # Get the bet with calculated current total from bet_contributions
-        response = supabase.table('bets')\
-            .select('''
-                *,
-                (
-                    SELECT COALESCE(SUM(quantity), 0)
-                    FROM bet_contributions
-                    WHERE bet_id = bets.id
-                ) as current_total
-            ''')\
-            .eq('id', bet_id)\
-            .single()\
-            .execute()
+        # Totals are maintained on the bet row by the bet_contributions triggers
+        response = await aexecute_with_admin(
+            supabase.table('bets')
+            .select('*')
+            .eq('id', bet_id)
+            .single()
+        )
             
-        if not response.data:
+        if not response:
             raise HTTPException(status_code=404, detail=f"Bet with ID {bet_id} not found")
             
-        return response.data
+        return response
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/public/top-bets", response_model=List[BetResponse]) 
 async def get_top_public_bets(
-    limit: int = 10,
-    offset: int = 0
+    response: Response,
+    page: PageParams = Depends(),
+    sort: str = Query('new', pattern='^(new|hot)$'),
+    window_hours: int = Query(24, ge=1, le=24 * 30)
 ):
+    """
+    Bets from public groups. `sort=new` pages newest-first with a cursor;
+    `sort=hot` ranks by recent contributions per unit of age (first `limit` rows only).
+    """
     try:
-        # First get public group ids
-        public_groups = supabase.table('groups')\
-            .select('id')\
-            .eq('is_private', False)\
-            .execute()
-        
-        public_group_ids = [group['id'] for group in public_groups.data]
-        
-        # Get bets with contributions total
-        response = supabase.table('bets')\
-            .select('''
-                *,
-                groups(*),
-                users!creator_id(*),
-                (
-                    SELECT COALESCE(SUM(quantity), 0)
-                    FROM bet_contributions
-                    WHERE bet_id = bets.id
-                ) as current_total
-            ''')\
-            .in_('group_id', public_group_ids)\
-            .order('created_at', desc=True)\
-            .range(offset, offset + limit - 1)\
-            .execute()
+        if sort == 'hot':
+            return await aexecute_with_admin(supabase.rpc('get_hot_public_bets', {
+                'p_limit': page.limit,
+                'p_window_hours': window_hours
+            }))
+
+        # public_bets joins bets to non-private groups in the database
+        bets, _ = await fetch_page(
+            supabase.table('public_bets').select('*'),
+            page,
+            response
+        )
         
-        return response.data
+        return bets
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,209 +1,217 @@
-from fastapi import APIRouter, HTTPException, Depends
-from ..config.supabase_setup import supabase, execute_with_admin
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from ..config.supabase_setup import supabase, aexecute_with_admin, as_http_exception
 from typing import List, Optional
 from ..models.groups import GroupCreate, GroupResponse, GroupMember
-from ..api.users import get_current_user
-from datetime import datetime
+from ..api.users import get_current_user, get_stream_user
+from ..utils.pagination import NEXT_CURSOR_HEADER, PageParams, fetch_page
+from ..utils.response_cache import (
+    PUBLIC_GROUPS_NAMESPACE,
+    group_namespace,
+    make_etag,
+    not_modified,
+    response_cache
+)
+from ..utils.auth_cache import token_cache
+from ..utils.membership import membership_cache
+from ..utils.premium import is_premium_now
+import logging
 
 router = APIRouter(prefix="/groups", tags=["groups"])
+logger = logging.getLogger(__name__)
 
 @router.get("/public", response_model=List[GroupResponse])
 async def get_public_groups(
-    limit: int = 10,
-    offset: int = 0,
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
     search: Optional[str] = None
 ):
-    """Get public groups with optional search"""
+    """Get public groups with optional search, newest first"""
     try:
-        # Build the base query
-        query = supabase.table('groups')\
-            .select('*')\
-            .eq('is_private', False)\
-            .order('created_at', desc=True)
-            
-        if search:
-            query = query.ilike('name', f'%{search}%')
-            
-        # Add pagination
-        query = query.range(offset, offset + limit - 1)
-        
-        # Execute with admin privileges
-        result = execute_with_admin(query)
+        async def fetch():
+            # Build the base query
+            query = supabase.table('groups')\
+                .select('*')\
+                .eq('is_private', False)
+                
+            if search:
+                query = query.ilike('name', f'%{search}%')
+                
+            # Execute with admin privileges, one keyset page at a time
+            items, next_cursor = await fetch_page(query, page)
+            return {"items": items, "next_cursor": next_cursor}
+
+        result, etag = await response_cache.get_or_fetch(
+            PUBLIC_GROUPS_NAMESPACE,
+            (search, page.limit, page.cursor),
+            fetch
+        )
         
-        # Handle empty result
-        if result is None:
-            return []
+        cached_response = not_modified(request, etag)
+        if cached_response:
+            return cached_response
+
+        response.headers['ETag'] = etag
+        if result['next_cursor']:
+            response.headers[NEXT_CURSOR_HEADER] = result['next_cursor']
             
-        return result
+        return result['items']
         
     except Exception as e:
-        print(f"Error fetching public groups: {str(e)}")
+        logger.warning("Error fetching public groups: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/", response_model=GroupResponse)
 async def create_group(group: GroupCreate, current_user: dict = Depends(get_current_user)):
     try:
-        print(f"Creating group with data: {group}")
-        print(f"Current user: {current_user}")
+        logger.debug("Creating group for user %s", current_user['id'])
         
-        # Get user's current group count and premium status
-        user_query = supabase.table('users')\
-            .select('groups_created, premium_expires_at')\
-            .eq('id', current_user['id'])\
-            .single()
-            
-        user_data = execute_with_admin(user_query)
-        print(f"User data: {user_data}")
-        
-        if not user_data:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        is_premium = user_data.get('premium_expires_at') and \
-                    datetime.fromisoformat(user_data['premium_expires_at'].replace('Z', '+00:00')) > datetime.utcnow()
+        # The users row (with its precomputed is_premium flag) comes from the auth cache,
+        # so free users at their limit are turned away without a round-trip
+        is_premium = is_premium_now(current_user)
             
         # Check if non-premium user has reached group limit
-        if not is_premium and user_data.get('groups_created', 0) >= 1:
+        if not is_premium and current_user.get('groups_created', 0) >= 1:
             raise HTTPException(
                 status_code=403,
                 detail="Free users can only create 1 group. Upgrade to premium for unlimited groups!"
             )
         
-        # Create the group using admin client
-        group_data = {
-            "name": group.name,
-            "is_private": group.is_private,
-            "firebase_uid": str(current_user['firebase_uid']),  # Store Firebase UID
-            "created_by": current_user['id'],  # Keep the UUID foreign key
-            "created_at": datetime.utcnow().isoformat()
-        }
-        print(f"Creating group with data: {group_data}")
-        
-        group_query = supabase.table('groups').insert(group_data)
-        group_result = execute_with_admin(group_query)
+        # Limit check, group, admin membership and group count in one transaction;
+        # the function re-checks the limit against the locked users row
+        group_result = await aexecute_with_admin(supabase.rpc('create_group_with_admin', {
+            "p_user_id": current_user['id'],
+            "p_name": group.name,
+            "p_is_private": group.is_private
+        }))
         
         if not group_result:
             raise HTTPException(status_code=400, detail="Failed to create group")
-            
-        group_id = group_result[0]['id']
-        print(f"Created group with ID: {group_id}")
-        
-        # Add creator as admin member
-        member_data = {
-            "group_id": group_id,
-            "user_id": current_user['id'],
-            "is_admin": True,
-            "joined_at": datetime.utcnow().isoformat()
-        }
-        print(f"Adding member with data: {member_data}")
+        logger.info("User %s created group %s", current_user['id'], group_result[0]['id'])
         
-        member_query = supabase.table('group_members').insert(member_data)
-        member_result = execute_with_admin(member_query)
-        
-        if not member_result:
-            # Rollback group creation
-            print("Failed to add member, rolling back group creation")
-            delete_query = supabase.table('groups').delete().eq('id', group_id)
-            execute_with_admin(delete_query)
-            raise HTTPException(status_code=400, detail="Failed to add member to group")
-        
-        # Increment user's group count
-        update_query = supabase.table('users')\
-            .update({"groups_created": user_data.get('groups_created', 0) + 1})\
-            .eq('id', current_user['id'])
-            
-        execute_with_admin(update_query)
-        print("Successfully created group and added member")
+        token_cache.invalidate_user(current_user['id'], current_user['firebase_uid'])
+        membership_cache.invalidate(current_user['id'])
+        if not group.is_private:
+            await response_cache.invalidate(PUBLIC_GROUPS_NAMESPACE)
         
         return group_result[0]
         
-    except HTTPException as he:
-        raise he
     except Exception as e:
-        print(f"Error creating group: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
+        logger.warning("Error creating group: %s", e)
+        raise as_http_exception(e)
 
-@router.get("/{group_id}", response_model=GroupResponse)
-async def get_group(group_id: str, current_user: dict = Depends(get_current_user)):
-    try:
-        print(f"Getting group {group_id} for user {current_user['id']}")
-        
+async def _get_group_row(group_id: str) -> Optional[dict]:
+    """Fetch a group row, served from the response cache when possible"""
+    async def fetch():
         # Get the group using admin client
         group_query = supabase.table('groups')\
             .select('*')\
             .eq('id', group_id)\
             .single()
+        return await aexecute_with_admin(group_query)
+
+    group, _ = await response_cache.get_or_fetch(group_namespace(group_id), ('row',), fetch)
+    return group
+
+async def get_accessible_group(group_id: str, current_user: dict = Depends(get_current_user)) -> dict:
+    """
+    Dependency: the group row, if the current user may view it
+    (public group, creator, or member). Raises 404/403 otherwise.
+    """
+    return await _accessible_group(group_id, current_user)
+
+async def get_accessible_group_for_stream(group_id: str, current_user: dict = Depends(get_stream_user)) -> dict:
+    """get_accessible_group for Server-Sent Events routes (see get_stream_user)"""
+    return await _accessible_group(group_id, current_user)
+
+async def _accessible_group(group_id: str, current_user: dict) -> dict:
+    try:
+        group = await _get_group_row(group_id)
+    except Exception as e:
+        logger.warning("Error getting group %s: %s", group_id, e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+
+    # Public groups and the creator never need the membership lookup
+    if not group['is_private'] or group['firebase_uid'] == current_user['firebase_uid']:
+        return group
+
+    # If group is private and user is not a member or creator, deny access
+    if not await membership_cache.is_member(current_user['id'], group_id):
+        raise HTTPException(
+            status_code=403, 
+            detail="You don't have access to this group"
+        )
+    return group
+
+async def require_group_member(group_id: str, current_user: dict = Depends(get_current_user)) -> dict:
+    """Dependency: ensure the current user is a member of the group"""
+    if not await membership_cache.is_member(current_user['id'], group_id):
+        raise HTTPException(status_code=403, detail="You are not a member of this group")
+    return current_user
+
+@router.get("/{group_id}", response_model=GroupResponse)
+async def get_group(
+    group_id: str,
+    request: Request,
+    response: Response,
+    group: dict = Depends(get_accessible_group),
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        logger.debug("Getting group %s for user %s", group_id, current_user['id'])
             
-        group = execute_with_admin(group_query)
-        print(f"Group data: {group}")
-        
-        if not group:
-            raise HTTPException(status_code=404, detail="Group not found")
-            
-        # Check if user is a member
-        member_query = supabase.table('group_members')\
-            .select('*')\
-            .eq('group_id', group_id)\
-            .eq('user_id', current_user['id'])
-            
-        member = execute_with_admin(member_query)
-        print(f"Member data: {member}")
-        
-        # If group is private and user is not a member or creator, deny access
-        if (group['is_private'] and 
-            not member and 
-            group['firebase_uid'] != current_user['firebase_uid']):
-            raise HTTPException(
-                status_code=403, 
-                detail="You don't have access to this group"
-            )
-            
-        # Add current user info to response
-        group['current_user_email'] = current_user.get('email')
+        # Add current user info to a copy; the group dict is shared through the cache
+        group = {**group, 'current_user_email': current_user.get('email')}
+
+        etag = make_etag(group)
+        cached_response = not_modified(request, etag)
+        if cached_response:
+            return cached_response
+        response.headers['ETag'] = etag
             
         return group
         
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error getting group: {str(e)}")
+        logger.warning("Error getting group %s: %s", group_id, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{join_code}/join")
 async def join_group(join_code: str, current_user: dict = Depends(get_current_user)):
     try:
         # Find the group using admin client
-        group = execute_with_admin(
+        group = await aexecute_with_admin(
             supabase.table('groups')
             .select('id')
             .eq('join_code', join_code)
             .single()
         )
         
-        if not group.data:
+        if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        # Check if user is already a member using admin client
-        existing_member = execute_with_admin(
-            supabase.table('group_members')
-            .select('id')
-            .eq('group_id', group.data['id'])
-            .eq('user_id', current_user['id'])
-        )
-            
-        if existing_member.data:
+        # Check if user is already a member
+        if await membership_cache.is_member(current_user['id'], group['id']):
             raise HTTPException(status_code=400, detail="You are already a member of this group")
         
         # Add user to group using admin client
-        response = execute_with_admin(
+        response = await aexecute_with_admin(
             supabase.table('group_members')
             .insert({
-                "group_id": group.data['id'],
+                "group_id": group['id'],
                 "user_id": current_user['id']
             })
         )
         
-        if not response.data:
+        if not response:
             raise HTTPException(status_code=400, detail="Failed to join group")
+
+        membership_cache.invalidate(current_user['id'])
+        await response_cache.invalidate(group_namespace(group['id']))
         
         return {"message": "Successfully joined group"}
     except HTTPException as he:
@@ -212,29 +220,32 @@ async def join_group(join_code: str, current_user: dict = Depends(get_current_us
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{group_id}/leave")
-async def leave_group(group_id: str, current_user: dict = Depends(get_current_user)):
+async def leave_group(group_id: str, current_user: dict = Depends(require_group_member)):
     try:
-        # Check if user is the last admin using admin client
-        admins = execute_with_admin(
-            supabase.table('group_members')
-            .select('user_id')
-            .eq('group_id', group_id)
-            .eq('is_admin', True)
-        )
-        
-        if len(admins.data) == 1 and admins.data[0]['user_id'] == current_user['id']:
-            raise HTTPException(
-                status_code=400, 
-                detail="You are the last admin. Please assign another admin before leaving."
+        # Only an admin can be the last admin, so members skip the admin count
+        if await membership_cache.is_admin(current_user['id'], group_id):
+            admins = await aexecute_with_admin(
+                supabase.table('group_members')
+                .select('user_id')
+                .eq('group_id', group_id)
+                .eq('is_admin', True)
             )
+            
+            if len(admins) == 1 and admins[0]['user_id'] == current_user['id']:
+                raise HTTPException(
+                    status_code=400, 
+                    detail="You are the last admin. Please assign another admin before leaving."
+                )
         
         # Remove user from group using admin client
-        response = execute_with_admin(
+        response = await aexecute_with_admin(
             supabase.table('group_members')
             .delete()
             .eq('group_id', group_id)
             .eq('user_id', current_user['id'])
         )
+        membership_cache.invalidate(current_user['id'])
+        await response_cache.invalidate(group_namespace(group_id))
         return {"message": "Successfully left group"}
     except HTTPException as he:
         raise he
@@ -242,66 +253,57 @@ async def leave_group(group_id: str, current_user: dict = Depends(get_current_us
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{group_id}/members", response_model=List[GroupMember])
-async def get_group_members(group_id: str, current_user: dict = Depends(get_current_user)):
+async def get_group_members(
+    group_id: str,
+    request: Request,
+    response: Response,
+    group: dict = Depends(get_accessible_group)
+):
     try:
-        print(f"Getting members for group {group_id}")
+        logger.debug("Getting members for group %s", group_id)
         
-        # First check if group exists and user has access
-        group_query = supabase.table('groups')\
-            .select('*')\
-            .eq('id', group_id)\
-            .single()
-            
-        group = execute_with_admin(group_query)
-        if not group:
-            raise HTTPException(status_code=404, detail="Group not found")
-            
-        # Check if user is a member
-        member_query = supabase.table('group_members')\
-            .select('*')\
-            .eq('group_id', group_id)\
-            .eq('user_id', current_user['id'])
-            
-        member = execute_with_admin(member_query)
-        
-        # If group is private and user is not a member or creator, deny access
-        if (group['is_private'] and 
-            not member and 
-            group['firebase_uid'] != current_user['firebase_uid']):
-            raise HTTPException(
-                status_code=403, 
-                detail="You don't have access to this group"
-            )
-        
-        # Get all members with their user info
-        members_query = supabase.table('group_members')\
-            .select(
-                'user_id',
-                'is_admin',
-                'joined_at',
-                'users(email, username)'
-            )\
-            .eq('group_id', group_id)
+        async def fetch():
+            # Get all members with their user info
+            members_query = supabase.table('group_members')\
+                .select(
+                    'user_id',
+                    'is_admin',
+                    'joined_at',
+                    'users(email, username)'
+                )\
+                .eq('group_id', group_id)
+                
+            members = await aexecute_with_admin(members_query)
+            logger.debug("Found %d members in group %s", len(members or []), group_id)
             
-        members = execute_with_admin(members_query)
-        print(f"Found {len(members) if members else 0} members")
-        
-        # Transform the response to match our model
-        transformed_members = []
-        for member in (members or []):
-            user_info = member.get('users', {})
-            transformed_members.append({
-                'user_id': member['user_id'],
-                'username': user_info.get('username'),
-                'email': user_info.get('email'),
-                'is_admin': member.get('is_admin', False),
-                'joined_at': member['joined_at']
-            })
+            # Transform the response to match our model
+            transformed_members = []
+            for member in (members or []):
+                user_info = member.get('users', {})
+                transformed_members.append({
+                    'user_id': member['user_id'],
+                    'username': user_info.get('username'),
+                    'email': user_info.get('email'),
+                    'is_admin': member.get('is_admin', False),
+                    'joined_at': member['joined_at']
+                })
+            return transformed_members
+
+        transformed_members, etag = await response_cache.get_or_fetch(
+            group_namespace(group_id),
+            ('members',),
+            fetch
+        )
+
+        cached_response = not_modified(request, etag)
+        if cached_response:
+            return cached_response
+        response.headers['ETag'] = etag
         
         return transformed_members
         
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error getting group members: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        logger.warning("Error getting members of group %s: %s", group_id, e)
+        raise HTTPException(status_code=400, detail=str(e))
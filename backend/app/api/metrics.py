@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..utils.auth_cache import token_cache
+from ..utils.membership import membership_cache
+from ..utils.metrics import metrics
+from ..utils.notification_dispatcher import notification_dispatcher
+from ..utils.realtime import realtime_hub
+from ..utils.response_cache import response_cache
+from ..utils.shared_state import shared_state
+
+router = APIRouter(tags=["metrics"])
+
+metrics.register_gauges("token_cache", token_cache.stats)
+metrics.register_gauges("membership_cache", membership_cache.stats)
+metrics.register_gauges("response_cache", response_cache.stats)
+metrics.register_gauges("realtime_hub", realtime_hub.stats)
+metrics.register_gauges("notification_dispatcher", notification_dispatcher.stats)
+metrics.register_gauges("shared_state", shared_state.stats)
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of request, upstream-call and cache metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,54 +1,119 @@
-from fastapi import APIRouter, HTTPException
-from ..config.supabase_setup import supabase
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response
+from ..config.supabase_setup import supabase, aexecute_with_admin
+from typing import Dict, List, Optional
 from ..models.notifications import Notification
+from ..api.users import get_current_user, get_stream_user
+from ..utils.notification_dispatcher import notification_dispatcher
+from ..utils.pagination import PageParams, encode_cursor, fetch_page, keyset_page
+from ..utils.realtime import realtime_hub, sse_response
+import logging
+import os
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
+logger = logging.getLogger(__name__)
+
+# Most notifications replayed on reconnect; older ones are left to the paginated listing
+NOTIFICATION_REPLAY_LIMIT = int(os.getenv("NOTIFICATION_REPLAY_LIMIT", "500"))
 
 async def notify_witnesses_required(bet_id: str):
+    """
+    Queue a WITNESS_REQUIRED notification for every member of the bet's group.
+    Runs as a background task, so failures are logged rather than raised.
+    """
     try:
         # Get group members who could be witnesses
-        bet = supabase.table('bets')\
-            .select('group_id')\
-            .eq('id', bet_id)\
-            .single()\
-            .execute()
+        bet = await aexecute_with_admin(
+            supabase.table('bets')
+            .select('group_id')
+            .eq('id', bet_id)
+            .single()
+        )
             
-        if bet.data:
-            group_members = supabase.table('group_members')\
-                .select('user_id')\
-                .eq('group_id', bet.data['group_id'])\
-                .execute()
+        if bet:
+            group_members = await aexecute_with_admin(
+                supabase.table('group_members')
+                .select('user_id')
+                .eq('group_id', bet['group_id'])
+            )
                 
-            # Create notifications for each potential witness
-            for member in group_members.data:
-                await create_notification(
-                    member['user_id'],
-                    'WITNESS_REQUIRED',
-                    f'Your verification is needed for a bet'
-                )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+            # Create notifications for each potential witness in bulk
+            await notification_dispatcher.submit([
+                {
+                    "user_id": member['user_id'],
+                    "type": 'WITNESS_REQUIRED',
+                    "message": 'Your verification is needed for a bet'
+                }
+                for member in group_members
+            ])
+    except Exception:
+        logger.exception("Error notifying witnesses for bet %s", bet_id)
 
-async def create_notification(user_id: str, type: str, message: str):
+@router.get("/", response_model=List[Notification])
+async def get_notifications(user_id: str, response: Response, page: PageParams = Depends()):
     try:
-        response = supabase.table('notifications').insert({
-            "user_id": user_id,
-            "type": type,
-            "message": message
-        }).execute()
-        return response.data[0]
+        notifications, _ = await fetch_page(
+            supabase.table('notifications')
+            .select('*')
+            .eq('user_id', user_id),
+            page,
+            response
+        )
+        return notifications
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/", response_model=List[Notification])
-async def get_notifications(user_id: str):
+def _notification_event_id(event: Dict) -> str:
+    # The keyset cursor of the row, so Last-Event-ID resumes exactly after it
+    return encode_cursor(event['record'])
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    current_user: dict = Depends(get_stream_user),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events for the current user's notifications.
+    On reconnect the browser sends Last-Event-ID and anything created since is replayed first.
+    """
+    # Subscribe before reading the replay so nothing created in between is missed
+    subscription = await realtime_hub.subscribe(('notifications', 'user_id', current_user['id']))
+
+    replay = []
+    if last_event_id:
+        try:
+            rows = await aexecute_with_admin(keyset_page(
+                supabase.table('notifications')
+                .select('*')
+                .eq('user_id', current_user['id']),
+                last_event_id,
+                NOTIFICATION_REPLAY_LIMIT,
+                desc=False
+            ))
+        except HTTPException:
+            realtime_hub.unsubscribe(subscription)
+            raise
+        except Exception as e:
+            realtime_hub.unsubscribe(subscription)
+            raise HTTPException(status_code=400, detail=str(e))
+
+        replay = [
+            {"type": "INSERT", "table": "notifications", "record": row}
+            for row in (rows or [])[:NOTIFICATION_REPLAY_LIMIT]
+        ]
+
+    return sse_response(request, subscription, replay, _notification_event_id)
+
+@router.get("/unread-count")
+async def get_unread_count(current_user: dict = Depends(get_current_user)):
+    """Unread notifications, kept up to date on the users row by a trigger"""
     try:
-        response = supabase.table('notifications')\
-            .select('*')\
-            .eq('user_id', user_id)\
-            .order('created_at', desc=True)\
-            .execute()
-        return response.data
+        user = await aexecute_with_admin(
+            supabase.table('users')
+            .select('unread_notifications')
+            .eq('id', current_user['id'])
+            .single()
+        )
+        return {"unread": user.get('unread_notifications', 0) if user else 0}
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
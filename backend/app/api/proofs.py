@@ -1,54 +1,67 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks, Depends
 from ..api.notifications import notify_witnesses_required
-from ..config.supabase_setup import supabase
+from ..config.supabase_setup import supabase, aexecute_with_admin, as_http_exception
+from ..api.users import get_current_user
 from typing import List, Optional
 from ..models.proofs import ProofSubmission, ProofVerification, ProofResponse
 
 router = APIRouter(prefix="/proofs", tags=["proofs"])
 
 @router.post("/submit", response_model=ProofResponse)
-async def submit_proof(proof_data: ProofSubmission):
+async def submit_proof(proof_data: ProofSubmission, background_tasks: BackgroundTasks):
     try:
         # Create proof record
-        response = supabase.table('bet_proofs').insert({
+        response = await aexecute_with_admin(supabase.table('bet_proofs').insert({
             "bet_id": proof_data.bet_id,
             "proof_image_url": proof_data.proof_image_url,
+            "proof_thumbnail_url": proof_data.proof_thumbnail_url,
             "required_witnesses": proof_data.required_witnesses,
             "verification_deadline": proof_data.verification_deadline
-        }).execute()
+        }))
         
-        # Notify potential witnesses (implementation in notifications.py)
-        await notify_witnesses_required(proof_data.bet_id)
+        # Notify potential witnesses after the response is sent (implementation in notifications.py)
+        background_tasks.add_task(notify_witnesses_required, proof_data.bet_id)
         
-        return response.data[0]
+        return response[0]
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{proof_id}/verify")
-async def verify_proof(proof_id: str, verification: ProofVerification):
+async def verify_proof(
+    proof_id: str,
+    verification: ProofVerification,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Record the current user's vote. Counting witnesses and flipping the proof to
+    'verified' happens atomically in record_proof_verification.
+    """
     try:
-        # Add verification
-        response = supabase.table('proof_verifications').insert({
-            "proof_id": proof_id,
-            "witness_id": "user_id",  # From auth
-            "verified": verification.verified,
-            "comment": verification.comment
-        }).execute()
+        proofs = await aexecute_with_admin(supabase.rpc('record_proof_verification', {
+            "p_proof_id": proof_id,
+            "p_witness_id": current_user['id'],
+            "p_verified": verification.verified,
+            "p_comment": verification.comment
+        }))
+        proof = proofs[0]
         
-        # Check if we have enough verifications
-        proof = await check_verification_status(proof_id)
-        
-        return {"message": "Verification submitted successfully"}
+        return {
+            "message": "Verification submitted successfully",
+            "verification_status": proof['verification_status'],
+            "current_witnesses": proof['current_witnesses'],
+            "required_witnesses": proof['required_witnesses']
+        }
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        raise as_http_exception(e)
 
 @router.get("/pending")
 async def get_pending_verifications():
     try:
-        response = supabase.table('bet_proofs')\
-            .select('*, bets(description)')\
-            .eq('verification_status', 'pending')\
-            .execute()
-        return response.data
+        response = await aexecute_with_admin(
+            supabase.table('bet_proofs')
+            .select('*, bets(description)')
+            .eq('verification_status', 'pending')
+        )
+        return response
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,38 +1,214 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from ..config.supabase_setup import supabase
-from typing import List, Optional
-import uuid
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from ..config.supabase_setup import supabase, aexecute_with_admin, run_sync
+from ..utils.images import UnsupportedImageError, process_image
+from typing import BinaryIO, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
 
-router = APIRouter(prefix="/storage", tags=["storage"])
+logger = logging.getLogger(__name__)
+
+# Uploads carry whole images, so they get more time than a regular query
+STORAGE_UPLOAD_TIMEOUT = float(os.getenv("STORAGE_UPLOAD_TIMEOUT_SECONDS", "60"))
+
+# Uploads are copied in chunks of this size, which bounds memory per upload
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAX_PROOF_IMAGE_BYTES = int(os.getenv("MAX_PROOF_IMAGE_BYTES", str(10 * 1024 * 1024)))
+# The whole multipart request: the image plus boundaries and part headers
+MAX_UPLOAD_REQUEST_BYTES = MAX_PROOF_IMAGE_BYTES + 64 * 1024
+
+def sniff_image_type(head: bytes) -> Optional[Tuple[str, str]]:
+    """Return (content_type, extension) from the file's magic bytes, or None if it isn't a supported image"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg', 'jpg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png', 'png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp', 'webp'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'image/gif', 'gif'
+    return None
+
+def _spool_upload(src: BinaryIO) -> Tuple[str, str]:
+    """
+    Copy an upload to a temporary file chunk by chunk, rejecting it as soon as it
+    exceeds MAX_PROOF_IMAGE_BYTES or its first bytes aren't an image. Blocking;
+    run it in the threadpool. Returns (temp_path, sha256 of the content); the
+    caller removes the file.
+    """
+    src.seek(0)
+    tmp = tempfile.NamedTemporaryFile(delete=False)
+    try:
+        total = 0
+        sniffed = None
+        digest = hashlib.sha256()
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            if sniffed is None:
+                sniffed = sniff_image_type(chunk[:16])
+                if sniffed is None:
+                    raise HTTPException(status_code=415, detail="Unsupported image type")
+            total += len(chunk)
+            if total > MAX_PROOF_IMAGE_BYTES:
+                raise HTTPException(status_code=413, detail="Image is too large")
+            digest.update(chunk)
+            tmp.write(chunk)
+
+        if sniffed is None:
+            raise HTTPException(status_code=400, detail="Empty file")
+        tmp.close()
+        return tmp.name, digest.hexdigest()
+    except BaseException:
+        tmp.close()
+        os.remove(tmp.name)
+        raise
+
+class _CappedReceive:
+    """ASGI receive that raises 413 once the request body passes `limit` bytes"""
+
+    def __init__(self, receive, limit: int):
+        self.receive = receive
+        self.limit = limit
+        self.received = 0
+
+    async def __call__(self):
+        message = await self.receive()
+        if message["type"] == "http.request":
+            self.received += len(message.get("body", b""))
+            if self.received > self.limit:
+                raise HTTPException(status_code=413, detail="Image is too large")
+        return message
+
+class UploadRoute(APIRoute):
+    """
+    Rejects request bodies over MAX_UPLOAD_REQUEST_BYTES before FastAPI parses them:
+    up front from Content-Length, or mid-stream for chunked uploads. Without this the
+    whole multipart body is spooled before the handler can check the image's size.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def capped_handler(request: Request):
+            length = request.headers.get("content-length")
+            if length and length.isdigit() and int(length) > MAX_UPLOAD_REQUEST_BYTES:
+                raise HTTPException(status_code=413, detail="Image is too large")
+            return await handler(Request(request.scope, _CappedReceive(request.receive, MAX_UPLOAD_REQUEST_BYTES)))
+
+        return capped_handler
+
+router = APIRouter(prefix="/storage", tags=["storage"], route_class=UploadRoute)
+
+def thumbnail_name(file_name: str) -> str:
+    stem, _, ext = file_name.rpartition('.')
+    return f"{stem}_thumb.{ext}"
+
+def blob_file_name(content_hash: str) -> str:
+    return f"{content_hash}.webp"
+
+def _proof_urls(file_name: str) -> dict:
+    bucket = supabase.storage.from_('proofs')
+    return {
+        "url": bucket.get_public_url(file_name),
+        "thumbnail_url": bucket.get_public_url(thumbnail_name(file_name))
+    }
+
+async def _upload_file(file_name: str, path: str, content_type: str):
+    # Streamed from disk off the event loop
+    return await run_sync(
+        supabase.storage.from_('proofs').upload,
+        file_name,
+        path,
+        # Names are content hashes, so an overwrite can only ever store the same image
+        {"content-type": content_type, "upsert": "true"},
+        timeout=STORAGE_UPLOAD_TIMEOUT
+    )
+
+async def _remove_unregistered(file_name: str, content_hash: str):
+    try:
+        # Unless a concurrent upload of the same image has registered it meanwhile
+        registered = await aexecute_with_admin(
+            supabase.table('proof_blobs').select('content_hash').eq('content_hash', content_hash)
+        )
+        if not registered:
+            await run_sync(supabase.storage.from_('proofs').remove, [file_name, thumbnail_name(file_name)])
+    except Exception:
+        logger.exception("Failed to remove unregistered proof image %s", file_name)
 
 @router.post("/upload-proof")
 async def upload_proof_image(file: UploadFile = File(...)):
+    """
+    Store a proof image re-encoded as WebP (max PROOF_MAX_DIMENSION px, EXIF stripped)
+    together with a thumbnail for list views.
+
+    Images are stored under the hash of the uploaded bytes; re-uploading a known
+    image only takes another reference on the stored copy.
+    """
     try:
-        # Generate unique filename
-        file_ext = file.filename.split('.')[-1]
-        file_name = f"{uuid.uuid4()}.{file_ext}"
-        
-        # Upload to Supabase Storage
-        file_bytes = await file.read()
-        response = supabase.storage\
-            .from_('proofs')\
-            .upload(file_name, file_bytes)
+        if file.size is not None and file.size > MAX_PROOF_IMAGE_BYTES:
+            raise HTTPException(status_code=413, detail="Image is too large")
+        tmp_path, content_hash = await run_in_threadpool(_spool_upload, file.file)
+        file_name = blob_file_name(content_hash)
+        processed = ()
+        try:
+            # Known content: reuse the stored blob without processing or uploading again
+            existing = await aexecute_with_admin(
+                supabase.rpc('acquire_proof_blob', {'p_content_hash': content_hash})
+            )
+            if existing:
+                return _proof_urls(file_name)
+
+            try:
+                processed = await process_image(tmp_path)
+            except UnsupportedImageError:
+                raise HTTPException(status_code=415, detail="Unsupported image type")
+            full_path, thumb_path = processed
             
-        # Get public URL
-        public_url = supabase.storage\
-            .from_('proofs')\
-            .get_public_url(file_name)
+            # Upload both variants to Supabase Storage
+            await asyncio.gather(
+                _upload_file(file_name, full_path, 'image/webp'),
+                _upload_file(thumbnail_name(file_name), thumb_path, 'image/webp')
+            )
+            try:
+                await aexecute_with_admin(
+                    supabase.rpc('register_proof_blob', {'p_content_hash': content_hash})
+                )
+            except Exception:
+                # Unreferenced objects would never be deleted, so take them back out
+                await _remove_unregistered(file_name, content_hash)
+                raise
+        finally:
+            for path in (tmp_path, *processed):
+                os.remove(path)
             
-        return {"url": public_url}
+        # Get public URLs
+        return _proof_urls(file_name)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/delete-proof/{file_name}")
 async def delete_proof_image(file_name: str):
+    """Drop one reference to a proof image; the stored files go when the last reference does"""
     try:
-        response = supabase.storage\
-            .from_('proofs')\
-            .remove([file_name])
+        content_hash = file_name.rpartition('.')[0].removesuffix('_thumb')
+        file_name = f"{content_hash}.webp" if file_name.endswith('.webp') else file_name
+        # Decided under the blob's row lock: true once the last reference is gone (or
+        # for an untracked, pre-deduplication file), and only then are the objects removed
+        may_delete = await aexecute_with_admin(
+            supabase.rpc('release_proof_blob', {'p_content_hash': content_hash})
+        )
+        if not may_delete:
+            return {"message": "File deleted successfully"}
+
+        response = await run_sync(
+            supabase.storage.from_('proofs').remove,
+            [file_name, thumbnail_name(file_name)]
+        )
         return {"message": "File deleted successfully"}
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends
-from ..config.supabase_setup import supabase, execute_with_admin
+from ..config.supabase_setup import supabase, aexecute_with_admin
 from ..models.users import PremiumSubscription
 from ..api.users import get_current_user
+from ..utils.auth_cache import token_cache
+from ..utils.premium import is_premium_now
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/subscriptions", tags=["subscriptions"])
@@ -22,7 +24,7 @@ async def subscribe_to_premium(
         new_expires_at = datetime.utcnow() + timedelta(days=30)
         
         # Update user's premium status
-        response = execute_with_admin(
+        response = await aexecute_with_admin(
             supabase.table('users')
             .update({
                 'premium_expires_at': new_expires_at.isoformat(),
@@ -31,8 +33,9 @@ async def subscribe_to_premium(
             .eq('id', current_user['id'])
         )
         
-        if not response.data:
+        if not response:
             raise HTTPException(status_code=400, detail="Failed to update subscription")
+        token_cache.invalidate_user(current_user['id'], current_user['firebase_uid'])
             
         return {
             "message": "Successfully subscribed to premium",
@@ -48,7 +51,7 @@ async def cancel_premium_auto_renew(current_user: dict = Depends(get_current_use
     Cancel premium auto-renewal. The user will remain premium until their current period ends.
     """
     try:
-        response = execute_with_admin(
+        response = await aexecute_with_admin(
             supabase.table('users')
             .update({
                 'auto_renew_premium': False
@@ -56,8 +59,9 @@ async def cancel_premium_auto_renew(current_user: dict = Depends(get_current_use
             .eq('id', current_user['id'])
         )
         
-        if not response.data:
+        if not response:
             raise HTTPException(status_code=400, detail="Failed to cancel auto-renewal")
+        token_cache.invalidate_user(current_user['id'], current_user['firebase_uid'])
             
         return {"message": "Successfully cancelled premium auto-renewal"}
     except Exception as e:
@@ -66,26 +70,12 @@ async def cancel_premium_auto_renew(current_user: dict = Depends(get_current_use
 @router.get("/premium/status")
 async def get_premium_status(current_user: dict = Depends(get_current_user)):
     """
-    Get current premium subscription status
+    Get current premium subscription status.
+    Read from the cached users row; is_premium is maintained by the database and the renewal job,
+    and a subscription past its expiry reads as lapsed before the job gets to it.
     """
-    try:
-        user = execute_with_admin(
-            supabase.table('users')
-            .select('premium_expires_at, auto_renew_premium')
-            .eq('id', current_user['id'])
-            .single()
-        )
-        
-        if not user.data:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        expires_at = user.data.get('premium_expires_at')
-        is_premium = expires_at and datetime.fromisoformat(expires_at.replace('Z', '+00:00')) > datetime.utcnow()
-        
-        return {
-            "is_premium": is_premium,
-            "expires_at": expires_at,
-            "auto_renew": user.data.get('auto_renew_premium', False)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "is_premium": is_premium_now(current_user),
+        "expires_at": current_user.get('premium_expires_at'),
+        "auto_renew": current_user.get('auto_renew_premium', False)
+    }
@@ -1,14 +1,67 @@
-from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi import APIRouter, HTTPException, Header, Depends, Query, Response
 from ..models.groups import GroupResponse
-from ..config.supabase_setup import supabase, execute_with_admin
+from ..config.supabase_setup import supabase, aexecute_with_admin, run_sync
 from firebase_admin import auth
-from ..config.firebase_setup import admin_auth
+from ..config.firebase_app import admin_auth
 from typing import List, Optional, Dict
 from ..models.users import CreateUserBody, UserProfile, UserProfileUpdate, UserResponse
-from datetime import datetime
+from ..utils.auth_cache import token_cache
+from ..utils.cache import TTLCache
+from ..utils.premium import is_premium_now
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PageParams, fetch_page, page_params
+from datetime import date, datetime
+import asyncio
+import logging
+import os
 import uuid
 
 router = APIRouter(prefix="/users", tags=["users"])
+logger = logging.getLogger(__name__)
+
+# /users/get-users keeps the larger pages it had before the shared PageParams
+USER_PAGE_SIZE = 50
+USER_PAGE_MAX = 200
+FIREBASE_GET_USERS_BATCH = 100  # Firebase Admin limit per get_users call
+
+# Firebase display names change rarely; keep them local so listings don't hit Firebase
+display_name_cache = TTLCache(
+    maxsize=int(os.getenv("DISPLAY_NAME_CACHE_MAXSIZE", "50000")),
+    ttl=float(os.getenv("DISPLAY_NAME_CACHE_TTL_SECONDS", "600"))
+)
+
+async def _resolve_display_names(firebase_uids: List[str]) -> Dict[str, Optional[str]]:
+    """Resolve Firebase display names, serving from cache and batching the misses"""
+    names = {}
+    missing = []
+    for uid in dict.fromkeys(uid for uid in firebase_uids if uid):
+        if uid in display_name_cache:
+            names[uid] = display_name_cache.get(uid)
+        else:
+            missing.append(uid)
+
+    batches = [
+        missing[start:start + FIREBASE_GET_USERS_BATCH]
+        for start in range(0, len(missing), FIREBASE_GET_USERS_BATCH)
+    ]
+    results = await asyncio.gather(*[
+        run_sync(admin_auth.get_users, [auth.UidIdentifier(uid) for uid in batch])
+        for batch in batches
+    ])
+    for result in results:
+        for firebase_user in result.users:
+            names[firebase_user.uid] = firebase_user.display_name
+            display_name_cache.set(firebase_user.uid, firebase_user.display_name)
+        # Remember uids Firebase doesn't know too, so they aren't looked up every time
+        for identifier in result.not_found:
+            display_name_cache.set(identifier.uid, None)
+
+    return names
+
+def _joined_on(created_at) -> date:
+    """UserResponse.joined_at is the calendar day of the created_at timestamp"""
+    if isinstance(created_at, datetime):
+        return created_at.date()
+    return datetime.fromisoformat(str(created_at).replace('Z', '+00:00')).date()
 
 async def get_current_user(authorization: str = Header(None)):
     if not authorization or not authorization.startswith('Bearer '):
@@ -17,13 +70,34 @@ async def get_current_user(authorization: str = Header(None)):
             detail="Missing or invalid authorization header"
         )
     
-    token = authorization.split(' ')[1]
+    return await authenticate(authorization.split(' ')[1])
+
+async def get_stream_user(authorization: str = Header(None), access_token: Optional[str] = Query(None)):
+    """
+    get_current_user for Server-Sent Events routes. Browser EventSource cannot set
+    headers, so the Firebase ID token may also be passed as ?access_token=.
+    """
+    if access_token and not authorization:
+        return await authenticate(access_token)
+    return await get_current_user(authorization)
+
+async def authenticate(token: str) -> dict:
+    """Verify a Firebase ID token and return the matching users row, creating it on first sign-in"""
+    # Warm path: a token this worker (or, with shared state, any worker) has already
+    # verified needs no Firebase or Supabase call
+    cached_user = await token_cache.lookup(token)
+    if cached_user is not None:
+        return cached_user
+
     try:
         # Verify the Firebase token
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = await run_sync(auth.verify_id_token, token)
         firebase_uid = decoded_token['uid']
         
-        print(f"Firebase token verified for uid: {firebase_uid}")
+        logger.debug("Firebase token verified for uid %s", firebase_uid)
+        
+        # Read before the fetch, so a change made meanwhile retires what we share
+        version = await token_cache.version(firebase_uid)
         
         # Get user from Supabase using admin client
         query = supabase.table('users')\
@@ -31,11 +105,11 @@ async def get_current_user(authorization: str = Header(None)):
             .eq('firebase_uid', firebase_uid)\
             .single()
             
-        user = execute_with_admin(query)
+        user = await aexecute_with_admin(query)
         
         if not user:
             # Create user if they don't exist
-            print(f"User not found, creating new user for firebase_uid: {firebase_uid}")
+            logger.info("Creating user record for firebase uid %s", firebase_uid)
             create_query = supabase.table('users')\
                 .insert({
                     'id': str(uuid.uuid4()),
@@ -45,7 +119,7 @@ async def get_current_user(authorization: str = Header(None)):
                     'groups_created': 0,
                     'created_at': datetime.utcnow().isoformat()
                 })
-            user = execute_with_admin(create_query)
+            user = await aexecute_with_admin(create_query)
             if not user:
                 raise HTTPException(
                     status_code=500,
@@ -53,17 +127,18 @@ async def get_current_user(authorization: str = Header(None)):
                 )
             user = user[0]
             
-        print(f"User authenticated successfully: {user.get('id')}")
+        logger.debug("User %s authenticated", user.get('id'))
+        await token_cache.store(token, decoded_token, user, version)
         return user
         
     except auth.InvalidIdTokenError:
-        print("Invalid Firebase token")
+        logger.info("Invalid Firebase token")
         raise HTTPException(
             status_code=401,
             detail="Invalid or expired token"
         )
     except Exception as e:
-        print(f"Authentication error: {str(e)}")
+        logger.warning("Authentication error: %s", e)
         raise HTTPException(
             status_code=401,
             detail=f"Authentication failed: {str(e)}"
@@ -77,7 +152,8 @@ async def get_me(current_user: Dict = Depends(get_current_user)):
 async def create_user(body: CreateUserBody):
     try:
         # Create Firebase auth user first
-        firebase_user = admin_auth.create_user(
+        firebase_user = await run_sync(
+            admin_auth.create_user,
             display_name=body.username,
             email=body.email,
             password=body.password
@@ -89,11 +165,11 @@ async def create_user(body: CreateUserBody):
             "firebase_uid": firebase_user.uid  # Store Firebase UID in the firebase_uid column
         }
         
-        response = supabase.table("users")\
-            .insert(user_data)\
-            .execute()
+        response = await aexecute_with_admin(
+            supabase.table("users").insert(user_data)
+        )
         
-        created_user = response.data[0]
+        created_user = response[0]
         
         return {
             "id": created_user['id'],  # Use Supabase UUID
@@ -105,7 +181,7 @@ async def create_user(body: CreateUserBody):
         }
 
     except Exception as e:
-        print(f"Error creating user: {e}")
+        logger.warning("Error creating user: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/my-groups", response_model=List[GroupResponse])
@@ -116,7 +192,7 @@ async def get_my_groups(current_user: dict = Depends(get_current_user)):
             .select('groups(*)')\
             .eq('user_id', current_user['id'])
         
-        response = execute_with_admin(query)
+        response = await aexecute_with_admin(query)
         
         if not response:
             return []
@@ -124,27 +200,45 @@ async def get_my_groups(current_user: dict = Depends(get_current_user)):
         groups = [item['groups'] for item in response if item.get('groups')]
         return groups
     except Exception as e:
-        print(f"Error fetching user groups: {str(e)}")
+        logger.warning("Error fetching user groups: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/bets/history")
-async def get_user_bet_history(current_user: dict = Depends(get_current_user)):
+async def get_user_bet_history(
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    created_cursor: Optional[str] = None,
+    participated_cursor: Optional[str] = None
+):
+    """
+    Both lists are paginated independently; pass the matching next_*_cursor
+    from the previous response to continue either one.
+    """
     try:
         # Using Supabase UUID for both queries
-        created_bets = supabase.table('bets')\
-            .select('*')\
-            .eq('creator_id', current_user['id'])\
-            .execute()
-            
-        participated_bets = supabase.table('bet_contributions')\
-            .select('*, bets(*)')\
-            .eq('user_id', current_user['id'])\
-            .execute()
+        (created_bets, next_created_cursor), (participated_bets, next_participated_cursor) = await asyncio.gather(
+            fetch_page(
+                supabase.table('bets')
+                .select('*')
+                .eq('creator_id', current_user['id']),
+                PageParams(limit=limit, cursor=created_cursor)
+            ),
+            fetch_page(
+                supabase.table('bet_contributions')
+                .select('*, bets(*)')
+                .eq('user_id', current_user['id']),
+                PageParams(limit=limit, cursor=participated_cursor)
+            )
+        )
             
         return {
-            "created_bets": created_bets.data,
-            "participated_bets": participated_bets.data
+            "created_bets": created_bets,
+            "participated_bets": participated_bets,
+            "next_created_cursor": next_created_cursor,
+            "next_participated_cursor": next_participated_cursor
         }
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -152,54 +246,68 @@ async def get_user_bet_history(current_user: dict = Depends(get_current_user)):
 async def delete_user(user_id: str):
     try:
         # Get user from Supabase first
-        user = supabase.table("users")\
-            .select("*")\
-            .eq("id", user_id)\
-            .single()\
-            .execute()
+        user = await aexecute_with_admin(
+            supabase.table("users")
+            .select("*")
+            .eq("id", user_id)
+            .single()
+        )
             
-        if not user.data:
+        if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
         # Delete from Firebase using firebase_uid
-        admin_auth.delete_user(user.data['firebase_uid'])
+        await run_sync(admin_auth.delete_user, user['firebase_uid'])
         
         # Delete from Supabase using UUID
-        supabase.table("users")\
-            .delete()\
-            .eq("id", user_id)\
-            .execute()
+        await aexecute_with_admin(
+            supabase.table("users")
+            .delete()
+            .eq("id", user_id)
+        )
+        token_cache.invalidate_user(user_id, user['firebase_uid'])
             
         return {"message": "User deleted successfully"}
 
     except Exception as e:
-        print(f"Error deleting user: {e}")
+        logger.warning("Error deleting user: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/get-users", response_model=List[UserResponse])
-async def get_users():
+async def get_users(response: Response, page: PageParams = Depends(page_params(USER_PAGE_SIZE, USER_PAGE_MAX))):
+    """
+    List users a page at a time, newest first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        # Get users from Supabase with their stats
-        users = supabase.table("users")\
-            .select("*")\
-            .execute()
-        
-        user_list = []
-        for user_data in users.data:
-            # Get Firebase user info
-            firebase_user = admin_auth.get_user(user_data['firebase_uid'])
-            
-            # Get user's betting stats
-            stats = supabase.rpc(
-                'calculate_user_stats',
-                {"user_id": user_data['id']}  # Using Supabase UUID
-            ).execute().data
+        # Get one page of users from Supabase
+        users, _ = await fetch_page(supabase.table("users").select("*"), page, response)
 
+        if not users:
+            return []
+
+        # Stats for the whole page in one RPC, display names in batched Firebase lookups
+        stats_rows, display_names = await asyncio.gather(
+            aexecute_with_admin(supabase.rpc(
+                'calculate_users_stats',
+                {"user_ids": [user_data['id'] for user_data in users]}  # Using Supabase UUIDs
+            )),
+            _resolve_display_names([user_data['firebase_uid'] for user_data in users])
+        )
+        stats_by_user = {row['user_id']: row for row in (stats_rows or [])}
+
+        user_list = []
+        for user_data in users:
+            stats = stats_by_user.get(user_data['id'], {})
             user_obj = {
                 "id": user_data['id'],  # Use Supabase UUID
-                "username": firebase_user.display_name,
+                "username": display_names.get(user_data['firebase_uid']) or user_data.get('username') or '',
                 "email": user_data['email'],
-                "joined_at": user_data['created_at'],
+                "joined_at": _joined_on(user_data['created_at']),
+                "premium_expires_at": user_data.get('premium_expires_at'),
+                "auto_renew_premium": bool(user_data.get('auto_renew_premium')),
+                "groups_created": user_data.get('groups_created') or 0,
+                "is_premium": is_premium_now(user_data),
                 "total_bets": stats.get("total_bets", 0),
                 "wins": stats.get("wins", 0)
             }
@@ -207,41 +315,49 @@ async def get_users():
 
         return user_list
 
+    except HTTPException as he:
+        raise he
     except Exception as e:
-        print(f"Error getting users: {e}")
+        logger.warning("Error getting users: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(user_id: str):
     try:
         # Get Supabase user data
-        supabase_user = supabase.table("users")\
-            .select("*")\
-            .eq("id", user_id)\
-            .single()\
-            .execute()
+        supabase_user = await aexecute_with_admin(
+            supabase.table("users")
+            .select("*")
+            .eq("id", user_id)
+            .single()
+        )
             
-        if not supabase_user.data:
+        if not supabase_user:
             raise HTTPException(status_code=404, detail="User not found")
             
-        # Get Firebase user using firebase_uid
-        firebase_user = admin_auth.get_user(supabase_user.data['firebase_uid'])
+        # Get Firebase display name using firebase_uid
+        display_names = await _resolve_display_names([supabase_user['firebase_uid']])
             
-        # Get user's betting stats
-        stats = supabase.rpc(
-            'calculate_user_stats',
-            {"user_id": user_id}  # Using Supabase UUID
-        ).execute().data
+        # Get user's betting stats, from the same RPC as the user listing
+        stats_rows = await aexecute_with_admin(supabase.rpc(
+            'calculate_users_stats',
+            {"user_ids": [user_id]}  # Using Supabase UUID
+        ))
+        stats = (stats_rows or [{}])[0]
 
         return {
-            "id": supabase_user.data['id'],  # Use Supabase UUID
-            "username": firebase_user.display_name,
-            "email": supabase_user.data['email'],
-            "joined_at": supabase_user.data['created_at'],
+            "id": supabase_user['id'],  # Use Supabase UUID
+            "username": display_names.get(supabase_user['firebase_uid']) or supabase_user.get('username') or '',
+            "email": supabase_user['email'],
+            "joined_at": _joined_on(supabase_user['created_at']),
+            "premium_expires_at": supabase_user.get('premium_expires_at'),
+            "auto_renew_premium": bool(supabase_user.get('auto_renew_premium')),
+            "groups_created": supabase_user.get('groups_created') or 0,
+            "is_premium": is_premium_now(supabase_user),
             "total_bets": stats.get("total_bets", 0),
             "wins": stats.get("wins", 0)
         }
 
     except Exception as e:
-        print(f"Error getting user: {e}")
+        logger.warning("Error getting user: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
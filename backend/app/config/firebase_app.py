@@ -0,0 +1,30 @@
+import firebase_admin
+from firebase_admin import auth as admin_auth, credentials
+from .settings import get_settings
+
+def _credential():
+    settings = get_settings()
+    if settings.FIREBASE_CREDENTIALS_PATH:
+        return credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
+    if settings.FIREBASE_PRIVATE_KEY and settings.FIREBASE_CLIENT_EMAIL:
+        return credentials.Certificate({
+            "type": "service_account",
+            "project_id": settings.FIREBASE_PROJECT_ID,
+            "private_key_id": settings.FIREBASE_PRIVATE_KEY_ID,
+            # Env files usually carry the PEM with escaped newlines
+            "private_key": settings.FIREBASE_PRIVATE_KEY.replace("\\n", "\n"),
+            "client_email": settings.FIREBASE_CLIENT_EMAIL,
+            "client_id": settings.FIREBASE_CLIENT_ID,
+            "client_x509_cert_url": settings.FIREBASE_CLIENT_CERT_URL,
+            "token_uri": "https://oauth2.googleapis.com/token",
+        })
+    # Application Default Credentials, loaded lazily on the first Google API call
+    return None
+
+def init_firebase() -> firebase_admin.App:
+    """Initialize the default Firebase app once; later calls return the existing app"""
+    try:
+        return firebase_admin.get_app()
+    except ValueError:
+        project_id = get_settings().FIREBASE_PROJECT_ID
+        return firebase_admin.initialize_app(_credential(), {"projectId": project_id} if project_id else None)
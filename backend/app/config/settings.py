@@ -1,26 +1,39 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
-    # Firebase settings
-    FIREBASE_PROJECT_ID: str
-    FIREBASE_PRIVATE_KEY_ID: str
-    FIREBASE_PRIVATE_KEY: str
-    FIREBASE_CLIENT_EMAIL: str
-    FIREBASE_CLIENT_ID: str
-    FIREBASE_CLIENT_CERT_URL: str
+    # Firebase settings: a service account file, or its fields one by one.
+    # With neither, Application Default Credentials are used.
+    FIREBASE_CREDENTIALS_PATH: Optional[str] = None
+    FIREBASE_PROJECT_ID: Optional[str] = None
+    FIREBASE_PRIVATE_KEY_ID: Optional[str] = None
+    FIREBASE_PRIVATE_KEY: Optional[str] = None
+    FIREBASE_CLIENT_EMAIL: Optional[str] = None
+    FIREBASE_CLIENT_ID: Optional[str] = None
+    FIREBASE_CLIENT_CERT_URL: Optional[str] = None
 
-    # Supabase settings
-    SUPABASE_URL: str
-    SUPABASE_KEY: str
+    # Supabase settings (the API needs the service role key)
+    SUPABASE_URL: Optional[str] = None
+    SUPABASE_SERVICE_KEY: Optional[str] = None
+    SUPABASE_KEY: Optional[str] = None  # older name for the same key
+    # Connection pool and timeout tuning for the PostgREST client
+    SUPABASE_POOL_SIZE: int = 20
+    SUPABASE_TIMEOUT_SECONDS: float = 10
 
     # Application settings
     APP_NAME: str = "HAND API"
     DEBUG: bool = False
-    
+    CORS_ORIGINS: str = "http://localhost:3000"  # comma-separated
+
+    @property
+    def supabase_key(self) -> Optional[str]:
+        return self.SUPABASE_SERVICE_KEY or self.SUPABASE_KEY
+
     class Config:
         env_file = ".env"
+        extra = "ignore"
 
 @lru_cache()
 def get_settings():
-    return Settings()
\ No newline at end of file
+    return Settings()
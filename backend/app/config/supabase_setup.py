@@ -1,24 +1,132 @@
-import os
-from supabase import create_client, Client
+import logging
+import threading
+from functools import partial
+from typing import TYPE_CHECKING, Optional
+import anyio
+import httpx
+from fastapi import HTTPException
+from postgrest import APIError
+from postgrest.utils import SyncClient
 from dotenv import load_dotenv
+from .settings import get_settings
+from ..utils.metrics import track_upstream, upstream_target
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 load_dotenv()
 
-# Get environment variables
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")  # This should be the service role key
+logger = logging.getLogger(__name__)
+
+_client: Optional["Client"] = None
+_client_lock = threading.Lock()
+
+def get_supabase() -> "Client":
+    """
+    The shared Supabase client, created on first use (normally during app startup)
+    so that importing the app needs neither credentials nor the network.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
+
+def _create_client() -> "Client":
+    from supabase import create_client, ClientOptions
+
+    settings = get_settings()
+    if not settings.SUPABASE_URL or not settings.supabase_key:
+        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in environment variables")
+
+    client = create_client(
+        settings.SUPABASE_URL,
+        settings.supabase_key,
+        options=ClientOptions(
+            postgrest_client_timeout=settings.SUPABASE_TIMEOUT_SECONDS,
+            storage_client_timeout=settings.SUPABASE_TIMEOUT_SECONDS
+        )
+    )
+    _use_pooled_session(client)
+    return client
+
+def close_supabase() -> None:
+    """Close the pooled connections; the next use creates a fresh client"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.postgrest.session.close()
+            _client = None
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
+class _LazyClient:
+    """Stands in for the client at import time and forwards to get_supabase() on use"""
 
-# Create Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    def __getattr__(self, name):
+        return getattr(get_supabase(), name)
+
+supabase: "Client" = _LazyClient()
+
+def _use_pooled_session(client: "Client") -> None:
+    """Swap the PostgREST session for a keep-alive HTTP/2 one sized to SUPABASE_POOL_SIZE"""
+    pool_size = get_settings().SUPABASE_POOL_SIZE
+    session = client.postgrest.session
+    client.postgrest.session = SyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        follow_redirects=True,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size
+        )
+    )
+    session.close()
+
+_limiter = None
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    # Created lazily because a limiter must belong to the running event loop
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(get_settings().SUPABASE_POOL_SIZE)
+    return _limiter
 
 def execute_with_admin(query):
     """Execute a query with admin privileges"""
     try:
         result = query.execute()
         return result.data if hasattr(result, 'data') else result
-    except Exception as e:
-        print(f"Supabase admin operation failed: {e}")
-        raise e
\ No newline at end of file
+    except Exception:
+        logger.exception("Supabase admin operation failed")
+        raise
+
+def as_http_exception(e: Exception) -> HTTPException:
+    """
+    Map a failed query to an HTTPException. Database functions raise with a PTxxx
+    SQLSTATE to choose the status (PostgREST convention); anything else is a 400.
+    """
+    if isinstance(e, HTTPException):
+        return e
+    code = getattr(e, 'code', None) or ''
+    if isinstance(e, APIError) and code.startswith('PT') and code[2:].isdigit():
+        return HTTPException(status_code=int(code[2:]), detail=e.message)
+    return HTTPException(status_code=400, detail=str(e))
+
+async def run_sync(func, *args, timeout: float = None, **kwargs):
+    """
+    Run a blocking Supabase/Firebase call on the worker pool so the event loop stays free.
+    At most SUPABASE_POOL_SIZE calls are in flight at once, matching the HTTP connection pool.
+    Each call is timed and attributed to the current request (see utils.metrics).
+    """
+    with track_upstream(*upstream_target(func, args)), anyio.fail_after(timeout or get_settings().SUPABASE_TIMEOUT_SECONDS):
+        return await anyio.to_thread.run_sync(
+            partial(func, *args, **kwargs),
+            limiter=_get_limiter(),
+            abandon_on_cancel=True
+        )
+
+async def aexecute_with_admin(query, timeout: float = None):
+    """Async variant of execute_with_admin for use inside the async routers"""
+    return await run_sync(execute_with_admin, query, timeout=timeout)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -16,6 +16,26 @@ class BetContribution(BaseModel):
     quantity: int
     bet_side: str = "for"  # "for" or "against" for many_to_many
 
+class BetContributionBatch(BaseModel):
+    contributions: List[BetContribution] = Field(..., min_length=1, max_length=500)
+
+class BetContributionResult(BaseModel):
+    index: int
+    bet_id: str
+    accepted: bool
+    contribution_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BetTotals(BaseModel):
+    id: str
+    current_total: int = 0
+    total_for: int = 0
+    total_against: int = 0
+
+class BetContributionBatchResponse(BaseModel):
+    results: List[BetContributionResult]
+    totals: List[BetTotals]
+
 class BetResponse(BaseModel):
     id: str
     group_id: str
@@ -29,4 +49,6 @@ class BetResponse(BaseModel):
     required_witnesses: Optional[int] = 2
     verification_deadline: Optional[datetime]
     created_at: datetime
-    current_total: int = 0 
\ No newline at end of file
+    current_total: int = 0
+    total_for: int = 0
+    total_against: int = 0
\ No newline at end of file
@@ -3,8 +3,9 @@ from typing import List, Optional
 from datetime import datetime
 
 class Notification(BaseModel):
+    id: Optional[str] = None
     user_id: str
-    type: str  # 'WITNESS_REQUIRED', 'BET_ACCEPTED', 'VERIFICATION_COMPLETE', 'BET_COMPLETE'
+    type: str  # 'WITNESS_REQUIRED', 'BET_ACCEPTED', 'VERIFICATION_COMPLETE', 'BET_COMPLETE', 'PROOF_EXPIRED', 'BET_EXPIRED'
     message: str
     read: bool = False
     created_at: datetime
\ No newline at end of file
@@ -5,6 +5,7 @@ from datetime import datetime
 class ProofSubmission(BaseModel):
     bet_id: str
     proof_image_url: str
+    proof_thumbnail_url: Optional[str] = None
     required_witnesses: int = 2
     verification_deadline: Optional[datetime]
 
@@ -17,6 +18,7 @@ class ProofResponse(BaseModel):
     id: str
     bet_id: str
     proof_image_url: str
+    proof_thumbnail_url: Optional[str] = None
     verification_status: str
     required_witnesses: int
     current_witnesses: int
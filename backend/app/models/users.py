@@ -8,14 +8,9 @@ class UserProfile(BaseModel):
     created_at: datetime
     premium_expires_at: Optional[datetime] = None
     auto_renew_premium: bool = False
+    is_premium: bool = False
     groups_created: int = 0
 
-    @property
-    def is_premium(self) -> bool:
-        if not self.premium_expires_at:
-            return False
-        return self.premium_expires_at > datetime.utcnow()
-
 class UserProfileUpdate(BaseModel):
     username: Optional[str]
     email: Optional[str]
@@ -37,15 +32,10 @@ class UserResponse(BaseModel):
     premium_expires_at: Optional[datetime] = None
     auto_renew_premium: bool = False
     groups_created: int = 0
+    is_premium: bool = False
     total_bets: Optional[int] = 0
     wins: Optional[int] = 0
 
-    @property
-    def is_premium(self) -> bool:
-        if not self.premium_expires_at:
-            return False
-        return self.premium_expires_at > datetime.utcnow()
-
 class UserStats(BaseModel):
     total_bets: int
     wins: int
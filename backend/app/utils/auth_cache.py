@@ -0,0 +1,113 @@
+import hashlib
+import os
+import time
+from typing import Dict, Optional, Set
+
+from .cache import TTLCache
+from .shared_state import get_versioned, publish_soon, read_counter, set_versioned, shared_state
+
+TOKEN_CACHE_TOPIC = "token_cache"
+
+class TokenCache:
+    """
+    Caches verified Firebase ID tokens together with the resolved Supabase user row.
+
+    Entries are keyed by a hash of the raw token (the token itself is never stored),
+    never outlive the token's own `exp` claim, and can be dropped per user whenever
+    the user row changes.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl, on_evict=self._forget)
+        self._keys_by_user: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def key_for(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        user = self._entries.get(self.key_for(token))
+        return dict(user) if user is not None else None
+
+    def set(self, token: str, decoded_token: dict, user: dict) -> None:
+        self._put(self.key_for(token), user, self._ttl_for(decoded_token))
+
+    def _ttl_for(self, decoded_token: dict) -> float:
+        ttl = self._entries.ttl
+        if decoded_token.get('exp'):
+            ttl = min(ttl, decoded_token['exp'] - time.time())
+        return ttl
+
+    def _put(self, key: str, user: dict, ttl: float) -> None:
+        self._entries.set(key, dict(user), ttl=ttl)
+        if key in self._entries:
+            self._keys_by_user.setdefault(str(user['id']), set()).add(key)
+
+    async def lookup(self, token: str) -> Optional[dict]:
+        """
+        get(), falling back to the copy another worker shared. Only a token no worker
+        has seen yet needs verifying and the users row fetching.
+        """
+        user = self.get(token)
+        if user is not None or not shared_state.distributed:
+            return user
+        shared = await get_versioned(f"token:{self.key_for(token)}")
+        if shared is None:
+            return None
+        user, expires_at = shared
+        self._put(self.key_for(token), user, expires_at - time.time())
+        return dict(user)
+
+    @staticmethod
+    def _version_key(firebase_uid: str) -> str:
+        # Keyed by Firebase uid, the one identity known before the users row is fetched
+        return f"gen:uid:{firebase_uid}"
+
+    async def version(self, firebase_uid: str) -> Optional[int]:
+        """Read before fetching the users row, and pass to store(); None if the store is unreachable"""
+        if not shared_state.distributed:
+            return 0
+        return await read_counter(self._version_key(firebase_uid))
+
+    async def store(self, token: str, decoded_token: dict, user: dict, version: Optional[int]) -> None:
+        """set(), and share the entry with the other workers unless it was invalidated since `version`"""
+        self.set(token, decoded_token, user)
+        if shared_state.distributed:
+            await set_versioned(
+                f"token:{self.key_for(token)}", user, self._ttl_for(decoded_token),
+                self._version_key(decoded_token['uid']), version
+            )
+
+    def invalidate_user(self, user_id: str, firebase_uid: str) -> None:
+        """Drop the user's entries here now, and in every worker (this one included) once published"""
+        self._drop_user(str(user_id))
+
+        async def retire_shared_copies():
+            if shared_state.distributed:
+                await shared_state.incr(self._version_key(firebase_uid))
+
+        publish_soon(TOKEN_CACHE_TOPIC, str(user_id), before=retire_shared_copies)
+
+    def _drop_user(self, user_id: str) -> None:
+        for key in self._keys_by_user.pop(user_id, set()):
+            self._entries.pop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_user.clear()
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+    def _forget(self, key: str, user: dict) -> None:
+        keys = self._keys_by_user.get(str(user['id']))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[str(user['id'])]
+
+token_cache = TokenCache(
+    maxsize=int(os.getenv("AUTH_CACHE_MAXSIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+)
+shared_state.subscribe(TOKEN_CACHE_TOPIC, token_cache._drop_user)
@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+class TTLCache:
+    """Bounded LRU cache where every entry also carries its own expiry time."""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._on_evict = on_evict
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            self.pop(key)
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None and self._on_evict:
+            self._on_evict(key, entry[1])
+
+class VersionCounters:
+    """
+    Per-key version counters, bounded like TTLCache (least recently used keys go first).
+
+    Versions come from one increasing sequence, and a key that has been dropped reads
+    back as the highest version dropped so far. So a key's version never goes back to
+    a value it has had before an invalidation: a reader that compares the version
+    before and after some work still sees the change, at worst spuriously.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self._versions = TTLCache(maxsize=maxsize, ttl=float('inf'), on_evict=self._dropped)
+        self._sequence = 0
+        self._floor = 0
+
+    def get(self, key: Hashable) -> int:
+        return self._versions.get(key, self._floor)
+
+    def bump(self, key: Hashable) -> int:
+        self._sequence += 1
+        self._versions.set(key, self._sequence)
+        return self._sequence
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def _dropped(self, key: Hashable, version: int) -> None:
+        self._floor = max(self._floor, version)
@@ -0,0 +1,48 @@
+import os
+from typing import Dict, List
+from ..config.supabase_setup import supabase, aexecute_with_admin
+from .notification_dispatcher import notification_dispatcher
+
+DEADLINE_SWEEP_INTERVAL = float(os.getenv("DEADLINE_SWEEP_INTERVAL_SECONDS", "60"))
+DEADLINE_SWEEP_BATCH_SIZE = int(os.getenv("DEADLINE_SWEEP_BATCH_SIZE", "500"))
+
+def _expiry_notifications(swept: Dict) -> List[Dict]:
+    rows = [
+        {
+            "user_id": proof['creator_id'],
+            "type": 'PROOF_EXPIRED',
+            "message": 'Your proof was not verified before the deadline'
+        }
+        for proof in swept.get('proofs', [])
+    ]
+    rows.extend(
+        {
+            "user_id": bet['creator_id'],
+            "type": 'BET_EXPIRED',
+            "message": f"Your bet \"{bet['description']}\" expired"
+        }
+        for bet in swept.get('bets', [])
+    )
+    return rows
+
+async def sweep_expired_deadlines():
+    """
+    Expire overdue proofs and bets a batch at a time and queue notifications for
+    their creators. Returns early if another worker holds the sweep lock.
+    """
+    while True:
+        swept = await aexecute_with_admin(supabase.rpc(
+            'sweep_expired_deadlines',
+            {"p_batch_size": DEADLINE_SWEEP_BATCH_SIZE}
+        ))
+        if not swept:
+            return
+
+        rows = _expiry_notifications(swept)
+        if rows:
+            await notification_dispatcher.submit(rows)
+
+        # A short batch on both sides means nothing else is overdue
+        if (len(swept.get('proofs', [])) < DEADLINE_SWEEP_BATCH_SIZE
+                and len(swept.get('bets', [])) < DEADLINE_SWEEP_BATCH_SIZE):
+            return
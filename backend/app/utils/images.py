@@ -0,0 +1,72 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from PIL import Image, ImageOps
+
+PROOF_MAX_DIMENSION = int(os.getenv("PROOF_MAX_DIMENSION", "1600"))
+PROOF_THUMBNAIL_DIMENSION = int(os.getenv("PROOF_THUMBNAIL_DIMENSION", "320"))
+PROOF_WEBP_QUALITY = 80
+THUMBNAIL_WEBP_QUALITY = 70
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+# Refuse decompression bombs well before they can exhaust a worker's memory
+Image.MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(40_000_000)))
+
+class UnsupportedImageError(Exception):
+    pass
+
+def process_proof_image(src_path: str) -> Tuple[str, str]:
+    """
+    Re-encode an uploaded image as a downscaled WebP plus a thumbnail.
+
+    EXIF orientation is applied to the pixels first and no metadata is written
+    back, which strips location and device data. Runs in a worker process;
+    returns the paths of the two new files next to `src_path`.
+    """
+    full_path = f"{src_path}.webp"
+    thumb_path = f"{src_path}_thumb.webp"
+    try:
+        with Image.open(src_path) as img:
+            img = ImageOps.exif_transpose(img)
+            img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+            full = img.copy()
+            full.thumbnail((PROOF_MAX_DIMENSION, PROOF_MAX_DIMENSION), Image.Resampling.LANCZOS)
+            full.save(full_path, 'WEBP', quality=PROOF_WEBP_QUALITY, method=4)
+
+            thumb = img.copy()
+            thumb.thumbnail((PROOF_THUMBNAIL_DIMENSION, PROOF_THUMBNAIL_DIMENSION), Image.Resampling.LANCZOS)
+            thumb.save(thumb_path, 'WEBP', quality=THUMBNAIL_WEBP_QUALITY, method=4)
+    except (OSError, Image.DecompressionBombError) as e:
+        for path in (full_path, thumb_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise UnsupportedImageError(str(e))
+
+    return full_path, thumb_path
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Not fork: a forked worker would inherit the server's threads and open sockets
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context(method)
+        )
+    return _executor
+
+async def process_image(src_path: str) -> Tuple[str, str]:
+    """Run process_proof_image in the process pool so CPU work stays off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), process_proof_image, src_path)
+
+def shutdown_image_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
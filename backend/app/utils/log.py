@@ -0,0 +1,145 @@
+import atexit
+import fnmatch
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Per-route overrides, matched against the route template or path with shell-style wildcards:
+#   LOG_ROUTE_LEVELS="/api/groups/*=DEBUG,/api/users/me=WARNING"
+#   LOG_SAMPLE_RATES="/api/users/me=0.01,/api/notifications/*=0.1"
+LOG_ROUTE_LEVELS = os.getenv("LOG_ROUTE_LEVELS", "")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# The path of the request being served, so records can be filtered by route
+request_path: ContextVar[Optional[str]] = ContextVar("request_path", default=None)
+
+def _parse_overrides(spec: str) -> List[Tuple[str, str]]:
+    overrides = []
+    for part in spec.split(","):
+        pattern, _, value = part.strip().rpartition("=")
+        if pattern and value:
+            overrides.append((pattern, value))
+    return overrides
+
+class RouteFilter(logging.Filter):
+    """
+    Applies per-route levels and sampling. Sampling only ever drops records below
+    WARNING, so errors are always kept.
+    """
+
+    def __init__(self, levels: Dict[str, int], sample_rates: Dict[str, float], default_level: int):
+        super().__init__()
+        self.levels = levels
+        self.sample_rates = sample_rates
+        self.default_level = default_level
+
+    def _match(self, overrides: Dict, route: Optional[str]):
+        if route is None:
+            return None
+        for pattern, value in overrides.items():
+            if fnmatch.fnmatchcase(route, pattern):
+                return value
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        fields = getattr(record, "fields", None) or {}
+        route = fields.get("route") or request_path.get()
+        level = self._match(self.levels, route)
+        if record.levelno < (self.default_level if level is None else level):
+            return False
+        if record.levelno < logging.WARNING:
+            rate = self._match(self.sample_rates, route)
+            if rate is not None and random.random() >= rate:
+                return False
+        record.route = route
+        return True
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, route and any `fields`
+    extra. Records that carry their data in `fields` can pass a short `event` name
+    to use as the message instead of the rendered text.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": getattr(record, "event", None) or record.getMessage(),
+        }
+        route = getattr(record, "route", None)
+        if route:
+            entry["route"] = route
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread. The stock prepare()
+    renders the message on the calling thread, which here is the event loop; callers
+    pass scalars as arguments, so deferring is safe.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Shed log records rather than block a request on a backed-up stream
+            pass
+
+_listener: Optional[QueueListener] = None
+
+def configure_logging() -> None:
+    """
+    Route all logging through a bounded queue drained by a background thread, so
+    request handlers never block on stderr. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    default_level = logging.getLevelName(LOG_LEVEL)
+    levels = {pattern: logging.getLevelName(value.upper()) for pattern, value in _parse_overrides(LOG_ROUTE_LEVELS)}
+    sample_rates = {pattern: float(value) for pattern, value in _parse_overrides(LOG_SAMPLE_RATES)}
+
+    stream = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        stream.setFormatter(JSONFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+
+    handler = _DeferredQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    handler.addFilter(RouteFilter(levels, sample_rates, default_level))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    # The root level is the most verbose anything asks for; RouteFilter narrows it per
+    # route. When nothing asks for DEBUG, debug calls return before building a record.
+    root.setLevel(min([default_level, *levels.values()]))
+
+    _listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
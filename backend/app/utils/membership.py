@@ -0,0 +1,89 @@
+import os
+import time
+from typing import Dict, Optional
+from ..config.supabase_setup import supabase, aexecute_with_admin
+from .cache import TTLCache, VersionCounters
+from .shared_state import get_versioned, publish_soon, read_counter, set_versioned, shared_state
+
+MEMBERSHIP_CACHE_TOPIC = "membership_cache"
+
+class MembershipCache:
+    """
+    Per-user set of group memberships ({group_id: is_admin}).
+
+    A user's whole membership set is loaded with one query and kept for a TTL, so
+    every later "is U a member/admin of G" check is a dict lookup. Join/leave/create
+    must call invalidate() for the affected user.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self._sets = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Bumped on every invalidation, so a load that raced one is not cached
+        self._versions = VersionCounters(maxsize=maxsize)
+
+    async def memberships(self, user_id: str) -> Dict[str, bool]:
+        groups = self._sets.get(user_id)
+        if groups is not None:
+            return groups
+
+        local_version = self._versions.get(user_id)
+        if not shared_state.distributed:
+            groups = await self._fetch(user_id)
+            self._remember(user_id, groups, local_version)
+            return groups
+
+        # With several workers, the first one to load a user's set shares it
+        shared_key, version_key = f"membership:{user_id}", f"gen:membership:{user_id}"
+        shared = await get_versioned(shared_key)
+        if shared is not None:
+            groups, expires_at = shared
+            self._remember(user_id, groups, local_version, ttl=expires_at - time.time())
+            return groups
+        # Read the version first, so a change made while we query retires our copy;
+        # None (store unreachable) means nothing is shared
+        version = await read_counter(version_key)
+        groups = await self._fetch(user_id)
+        self._remember(user_id, groups, local_version)
+        await set_versioned(shared_key, groups, self._sets.ttl, version_key, version)
+        return groups
+
+    def _remember(self, user_id: str, groups: Dict[str, bool], version: int, ttl: Optional[float] = None) -> None:
+        if self._versions.get(user_id) == version:
+            self._sets.set(user_id, groups, ttl=ttl)
+
+    async def _fetch(self, user_id: str) -> Dict[str, bool]:
+        rows = await aexecute_with_admin(
+            supabase.table('group_members')
+            .select('group_id, is_admin')
+            .eq('user_id', user_id)
+        )
+        return {str(row['group_id']): bool(row.get('is_admin')) for row in (rows or [])}
+
+    async def is_member(self, user_id: str, group_id: str) -> bool:
+        return str(group_id) in await self.memberships(user_id)
+
+    async def is_admin(self, user_id: str, group_id: str) -> bool:
+        return (await self.memberships(user_id)).get(str(group_id), False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop the user's set here now, and in every worker (this one included) once published"""
+        self._drop(user_id)
+
+        async def retire_shared_copy():
+            if shared_state.distributed:
+                await shared_state.incr(f"gen:membership:{user_id}")
+
+        publish_soon(MEMBERSHIP_CACHE_TOPIC, str(user_id), before=retire_shared_copy)
+
+    def _drop(self, user_id: str) -> None:
+        self._versions.bump(user_id)
+        self._sets.pop(user_id)
+
+    def stats(self) -> dict:
+        return self._sets.stats()
+
+membership_cache = MembershipCache(
+    maxsize=int(os.getenv("MEMBERSHIP_CACHE_MAXSIZE", "10000")),
+    ttl=float(os.getenv("MEMBERSHIP_CACHE_TTL_SECONDS", "60"))
+)
+shared_state.subscribe(MEMBERSHIP_CACHE_TOPIC, membership_cache._drop)
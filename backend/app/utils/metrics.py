@@ -0,0 +1,261 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from .log import request_path
+
+# A request making more upstream calls than this is logged and counted as a likely N+1
+UPSTREAM_CALLS_WARN_THRESHOLD = int(os.getenv("UPSTREAM_CALLS_WARN_THRESHOLD", "10"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+logger = logging.getLogger("hand.requests")
+
+Labels = Tuple[str, ...]
+
+class Counter:
+    def __init__(self, name: str, help: str, label_names: Labels):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names: Labels, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Labels, Tuple[List[int], float, int]] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        counts, total, count = self._values.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self._values[labels] = (counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (str(bound),))} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {round(total, 6)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class RequestStats:
+    """Upstream calls made while serving one request"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.by_target: Dict[Tuple[str, str], List[float]] = {}  # (kind, target) -> [calls, seconds]
+
+    def record(self, kind: str, target: str, seconds: float) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        entry = self.by_target.setdefault((kind, target), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class Metrics:
+    """Process-wide request and upstream-call metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.requests = Histogram(
+            "hand_http_request_duration_seconds", "Time to serve a request",
+            ("method", "route", "status"), LATENCY_BUCKETS
+        )
+        self.request_upstream_calls = Histogram(
+            "hand_http_request_upstream_calls", "Upstream calls made per request",
+            ("route",), CALL_COUNT_BUCKETS
+        )
+        self.request_upstream_seconds = Counter(
+            "hand_http_request_upstream_seconds_total", "Time requests spent waiting on upstream calls",
+            ("route",)
+        )
+        self.upstream = Histogram(
+            "hand_upstream_call_duration_seconds", "Supabase, Storage and Firebase call latency",
+            ("kind", "target"), LATENCY_BUCKETS
+        )
+        self.upstream_errors = Counter(
+            "hand_upstream_call_errors_total", "Upstream calls that raised", ("kind", "target")
+        )
+        self.n_plus_one = Counter(
+            "hand_http_request_upstream_calls_exceeded_total",
+            f"Requests making more than {UPSTREAM_CALLS_WARN_THRESHOLD} upstream calls",
+            ("route",)
+        )
+        self._gauges: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def register_gauges(self, prefix: str, collect: Callable[[], Dict[str, float]]) -> None:
+        """Expose `collect()`'s numeric values as gauges named hand_<prefix>_<key>"""
+        self._gauges[prefix] = collect
+
+    def record_upstream(self, kind: str, target: str, seconds: float, failed: bool = False) -> None:
+        self.upstream.observe((kind, target), seconds)
+        if failed:
+            self.upstream_errors.inc((kind, target))
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.record(kind, target, seconds)
+
+    def record_request(self, method: str, route: str, status: int, seconds: float,
+                       stats: RequestStats, timed: bool = True) -> None:
+        if timed:
+            self.requests.observe((method, route, str(status)), seconds)
+        self.request_upstream_calls.observe((route,), stats.calls)
+        self.request_upstream_seconds.inc((route,), stats.seconds)
+
+        fields = {
+            "method": method,
+            "route": route,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 1),
+            "upstream_calls": stats.calls,
+            "upstream_ms": round(stats.seconds * 1000, 1),
+        }
+        message = " ".join(f"{key}={value}" for key, value in fields.items())
+        if stats.by_target:
+            # Which calls the time went to, e.g. upstream="supabase GET /groups 2x 3.1ms"
+            fields["upstream"] = {
+                f"{kind} {target}": {"calls": count, "ms": round(total * 1000, 1)}
+                for (kind, target), (count, total) in sorted(stats.by_target.items())
+            }
+            breakdown = ", ".join(f"{name} {entry['calls']}x {entry['ms']}ms" for name, entry in fields["upstream"].items())
+            message += f' upstream="{breakdown}"'
+
+        if stats.calls > UPSTREAM_CALLS_WARN_THRESHOLD:
+            self.n_plus_one.inc((route,))
+            logger.warning("n_plus_one %s", message,
+                           extra={"event": "n_plus_one", "fields": {**fields, "n_plus_one": True}})
+        elif timed and seconds * 1000 > SLOW_REQUEST_MS:
+            logger.warning("slow_request %s", message,
+                           extra={"event": "slow_request", "fields": {**fields, "slow": True}})
+        else:
+            logger.info("request %s", message, extra={"event": "request", "fields": fields})
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.requests, self.request_upstream_calls, self.request_upstream_seconds,
+                       self.upstream, self.upstream_errors, self.n_plus_one):
+            lines.extend(metric.render())
+        for prefix, collect in sorted(self._gauges.items()):
+            try:
+                values = collect()
+            except Exception:
+                logger.warning("Error collecting %s metrics", prefix, exc_info=True)
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (bool, int, float)):
+                    name = f"hand_{prefix}_{key}"
+                    lines.extend([f"# TYPE {name} gauge", f"{name} {float(value)}"])
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def upstream_target(func: Callable, args: tuple) -> Tuple[str, str]:
+    """Classify a blocking call handed to run_sync as (kind, target) for labelling"""
+    module = getattr(func, "__module__", "") or ""
+    name = getattr(func, "__name__", type(func).__name__)
+    if name == "execute_with_admin" and args:
+        # Builders keep their request line, e.g. "GET /groups" or "POST /rpc/create_group_with_admin"
+        query = args[0]
+        path = getattr(query, "path", None)
+        if path is None:
+            return "supabase", type(query).__name__
+        return "supabase", f"{getattr(query, 'http_method', '')} {path}".strip()
+    if module.startswith("firebase_admin"):
+        return "firebase", name
+    if module.startswith("storage3"):
+        return "storage", name
+    return "other", name
+
+@contextmanager
+def track_upstream(kind: str, target: str) -> Iterator[None]:
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        metrics.record_upstream(kind, target, time.perf_counter() - started, failed)
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware that times each request and attributes the upstream calls made
+    while serving it (including its background tasks) through a context variable.
+    The clock stops when the last body chunk is sent, so background tasks that run
+    afterwards add to the call counts but not the latency. Event streams are counted
+    but not timed, since their duration is the connection's.
+    """
+
+    def __init__(self, app, registry: Metrics = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        path_token = request_path.set(scope["path"])
+        status = 500
+        streaming = False
+        elapsed: Optional[float] = None
+
+        async def send_wrapper(message):
+            nonlocal status, streaming, elapsed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            request_path.reset(path_token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.registry.record_request(
+                scope["method"], route, status,
+                elapsed if elapsed is not None else time.perf_counter() - started,
+                stats, timed=not streaming
+            )
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+from ..config.supabase_setup import supabase, aexecute_with_admin
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_CHUNK_SIZE = int(os.getenv("NOTIFICATION_CHUNK_SIZE", "500"))
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "10000"))
+
+async def insert_notifications(rows: List[Dict], chunk_size: int = NOTIFICATION_CHUNK_SIZE) -> List[Dict]:
+    """Insert notification rows with one multi-row insert per chunk"""
+    created = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        result = await aexecute_with_admin(supabase.table('notifications').insert(chunk))
+        created.extend(result or [])
+    return created
+
+class NotificationDispatcher:
+    """
+    Writes notifications in the background.
+
+    Producers put rows on a bounded queue (waiting when it is full, which is the
+    backpressure), and a single worker drains whatever is queued into chunked
+    multi-row inserts.
+    """
+
+    def __init__(self, chunk_size: int = NOTIFICATION_CHUNK_SIZE, max_queue: int = NOTIFICATION_QUEUE_SIZE):
+        self.chunk_size = chunk_size
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        # Flush what is already queued before shutting the worker down
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, rows: List[Dict]):
+        if not self.running:
+            # No worker (e.g. scripts, tests): write synchronously instead of dropping
+            await insert_notifications(rows, self.chunk_size)
+            return
+        for row in rows:
+            await self._queue.put(row)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "failed": self.failed
+        }
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.chunk_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await insert_notifications(batch, self.chunk_size)
+                self.written += len(batch)
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Failed to write %d notifications", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+notification_dispatcher = NotificationDispatcher()
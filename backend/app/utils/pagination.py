@@ -0,0 +1,87 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException, Query, Response
+from ..config.supabase_setup import aexecute_with_admin
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+class PageParams:
+    """Query parameters shared by every cursor-paginated listing (use with Depends())"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+def page_params(default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE):
+    """A PageParams dependency with endpoint-specific limits: Depends(page_params(50, 200))"""
+    def dependency(
+        limit: int = Query(default, ge=1, le=maximum),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header")
+    ) -> PageParams:
+        return PageParams(limit=limit, cursor=cursor)
+    return dependency
+
+def encode_cursor(row: Dict[str, Any], sort_key: str = 'created_at') -> str:
+    """Build an opaque cursor pointing just past `row`"""
+    payload = json.dumps([row[sort_key], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return sort_value, row_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def keyset_page(query, cursor: Optional[str], limit: int, sort_key: str = 'created_at', desc: bool = True):
+    """
+    Apply keyset pagination on (sort_key, id) to a PostgREST select query.
+
+    One extra row is requested so the caller can tell whether another page
+    exists; pass the result rows to `split_page`.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        op = 'lt' if desc else 'gt'
+        query = query.or_(
+            f'{sort_key}.{op}."{sort_value}",'
+            f'and({sort_key}.eq."{sort_value}",id.{op}."{row_id}")'
+        )
+
+    return query\
+        .order(sort_key, desc=desc)\
+        .order('id', desc=desc)\
+        .limit(limit + 1)
+
+def split_page(rows: Optional[List[Dict]], limit: int, sort_key: str = 'created_at') -> Tuple[List[Dict], Optional[str]]:
+    """Trim the look-ahead row and return (page rows, next cursor or None)"""
+    rows = rows or []
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1], sort_key)
+
+async def fetch_page(
+    query,
+    page: PageParams,
+    response: Optional[Response] = None,
+    sort_key: str = 'created_at',
+    desc: bool = True
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Execute a keyset-paginated select and return (rows, next cursor).
+    When a response is given, the next cursor is also set as the X-Next-Cursor header.
+    """
+    rows = await aexecute_with_admin(keyset_page(query, page.cursor, page.limit, sort_key, desc))
+    items, next_cursor = split_page(rows, page.limit, sort_key)
+    if response is not None and next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items, next_cursor
@@ -0,0 +1,36 @@
+import asyncio
+import os
+import uuid
+from typing import Dict
+
+PREMIUM_PRICE_CENTS = int(os.getenv("PREMIUM_PRICE_CENTS", "499"))
+
+class LocalPaymentProvider:
+    """
+    Stand-in for the payment provider until a real one is wired up.
+
+    Charges always succeed, except for user ids listed in PAYMENT_DECLINE_USER_IDS.
+    Like a real provider, a repeated idempotency key returns the original charge
+    instead of charging again.
+    """
+
+    def __init__(self):
+        self._charges: Dict[str, Dict] = {}
+        self._declined = set(filter(None, os.getenv("PAYMENT_DECLINE_USER_IDS", "").split(",")))
+
+    async def charge(self, user_id: str, amount_cents: int, idempotency_key: str) -> Dict:
+        if idempotency_key in self._charges:
+            return self._charges[idempotency_key]
+
+        # Simulate the provider round trip
+        await asyncio.sleep(0)
+        charge = {
+            "id": f"ch_{uuid.uuid4().hex}",
+            "user_id": user_id,
+            "amount_cents": amount_cents,
+            "status": "failed" if user_id in self._declined else "succeeded"
+        }
+        self._charges[idempotency_key] = charge
+        return charge
+
+payment_provider = LocalPaymentProvider()
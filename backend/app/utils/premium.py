@@ -0,0 +1,101 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Dict, List
+from ..config.supabase_setup import supabase, aexecute_with_admin
+from .auth_cache import token_cache
+from .payments import PREMIUM_PRICE_CENTS, payment_provider
+
+PREMIUM_JOB_INTERVAL = float(os.getenv("PREMIUM_JOB_INTERVAL_SECONDS", "3600"))
+PREMIUM_RENEWAL_PAGE_SIZE = int(os.getenv("PREMIUM_RENEWAL_PAGE_SIZE", "500"))
+PREMIUM_RENEWAL_LEAD_HOURS = int(os.getenv("PREMIUM_RENEWAL_LEAD_HOURS", "24"))
+# Charges per period, one per job run, before a failing subscription is left to lapse
+PREMIUM_RENEWAL_MAX_ATTEMPTS = int(os.getenv("PREMIUM_RENEWAL_MAX_ATTEMPTS", "3"))
+# Held for most of an interval, so across all workers the job runs about once per interval
+PREMIUM_JOB_LEASE_SECONDS = int(os.getenv("PREMIUM_JOB_LEASE_SECONDS", str(int(PREMIUM_JOB_INTERVAL * 0.9))))
+
+def is_premium_now(user: Dict) -> bool:
+    """
+    The users row's is_premium flag, unless premium_expires_at has already passed;
+    the flag itself is only cleared by the next job run
+    """
+    if not user.get('is_premium'):
+        return False
+    expires_at = user.get('premium_expires_at')
+    if not expires_at:
+        return True
+    if not isinstance(expires_at, datetime):
+        expires_at = datetime.fromisoformat(str(expires_at).replace('Z', '+00:00'))
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at > datetime.now(timezone.utc)
+
+def renewal_idempotency_key(user_id: str, period_end: str, attempt: int = 1) -> str:
+    """
+    The same attempt on a subscription period always maps to the same key, across
+    workers; a retry after a failed charge is a new attempt with a new key
+    """
+    key = f"premium-renewal:{user_id}:{period_end}"
+    return key if attempt == 1 else f"{key}:retry-{attempt}"
+
+async def _attempt_renewal(due: Dict) -> Dict:
+    attempt = due.get('attempt') or 1
+    key = renewal_idempotency_key(due['user_id'], due['premium_expires_at'], attempt)
+    charge = await payment_provider.charge(due['user_id'], PREMIUM_PRICE_CENTS, key)
+    return {
+        "user_id": due['user_id'],
+        "period_end": due['premium_expires_at'],
+        "attempt": attempt,
+        "idempotency_key": key,
+        "payment_reference": charge['id'],
+        "status": charge['status']
+    }
+
+async def renew_due_subscriptions() -> List[str]:
+    """Charge and extend auto-renewing subscriptions a page at a time"""
+    renewed = []
+    after = None
+    while True:
+        due = await aexecute_with_admin(supabase.rpc('get_due_premium_renewals', {
+            "p_limit": PREMIUM_RENEWAL_PAGE_SIZE,
+            "p_after": after,
+            "p_lead_hours": PREMIUM_RENEWAL_LEAD_HOURS,
+            "p_max_attempts": PREMIUM_RENEWAL_MAX_ATTEMPTS
+        }))
+        if not due:
+            break
+
+        attempts = await asyncio.gather(*[_attempt_renewal(row) for row in due])
+        applied = await aexecute_with_admin(
+            supabase.rpc('apply_premium_renewals', {"p_renewals": attempts})
+        )
+        renewed.extend(row['user_id'] for row in applied or [])
+
+        if len(due) < PREMIUM_RENEWAL_PAGE_SIZE:
+            break
+        after = due[-1]['user_id']
+    return renewed
+
+async def run_premium_jobs():
+    """
+    Renew what is due, then clear the premium flag on lapsed subscriptions. Returns
+    early if another worker holds the job lease.
+    """
+    acquired = await aexecute_with_admin(supabase.rpc('try_acquire_job_lease', {
+        "p_name": "premium_jobs",
+        "p_ttl_seconds": PREMIUM_JOB_LEASE_SECONDS
+    }))
+    if not acquired:
+        return
+
+    renewed = await renew_due_subscriptions()
+    expired = await aexecute_with_admin(supabase.rpc('expire_premium_subscriptions'))
+
+    # Cached users carry is_premium, so drop the ones that changed
+    changed = list(dict.fromkeys([*renewed, *(row['user_id'] for row in expired or [])]))
+    if changed:
+        users = await aexecute_with_admin(
+            supabase.table('users').select('id, firebase_uid').in_('id', changed)
+        )
+        for user in users or []:
+            token_cache.invalidate_user(user['id'], user['firebase_uid'])
@@ -1,20 +1,280 @@
-from typing import Callable
-from ..config.supabase_setup import supabase
-
-class RealtimeManager:
-    def __init__(self):
-        self.supabase = supabase
-
-    async def subscribe_to_group_bets(self, group_id: str, callback: Callable):
-        return self.supabase\
-            .table('bets')\
-            .on('INSERT', lambda payload: callback(payload))\
-            .eq('group_id', group_id)\
-            .subscribe()
-
-    async def subscribe_to_bet_updates(self, bet_id: str, callback: Callable):
-        return self.supabase\
-            .table('bet_contributions')\
-            .on('INSERT', lambda payload: callback(payload))\
-            .eq('bet_id', bet_id)\
-            .subscribe()
+import asyncio
+import json
+import logging
+import os
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from ..config.settings import get_settings
+
+if TYPE_CHECKING:
+    from realtime import AsyncRealtimeChannel, AsyncRealtimeClient
+
+logger = logging.getLogger(__name__)
+
+REALTIME_CLIENT_QUEUE_SIZE = int(os.getenv("REALTIME_CLIENT_QUEUE_SIZE", "100"))
+# Backoff between attempts to reopen a dropped upstream socket
+REALTIME_RECONNECT_MAX_SECONDS = float(os.getenv("REALTIME_RECONNECT_MAX_SECONDS", "30"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+# Columns each table's events can be routed by
+ROUTING_COLUMNS = {
+    'bets': ('group_id', 'id'),
+    'bet_contributions': ('bet_id',),
+    'notifications': ('user_id',),
+}
+
+_DROPPED = object()
+
+Route = Tuple[str, str, str]  # (table, column, value)
+
+class Subscription:
+    """One local listener on one or more routes, fed by the hub through a bounded queue"""
+
+    def __init__(self, routes: List[Route], maxsize: int):
+        self.routes = routes
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+        self.reason = None
+
+    def deliver(self, event: Dict) -> bool:
+        """Queue an event without waiting. Returns False if the consumer has fallen behind."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drop(self, reason: str = "slow_consumer"):
+        # Free the backlog so the sentinel fits, the consumer sees it next and ends its stream
+        self.dropped = True
+        self.reason = reason
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_DROPPED)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Next event, or None on timeout. Raises ConnectionResetError (with the reason) once dropped."""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is _DROPPED:
+            raise ConnectionResetError(self.reason)
+        return event
+
+class RealtimeHub:
+    """
+    Process-wide fan-out of Supabase realtime changes.
+
+    Each table gets one upstream channel, opened on first use, however many clients
+    are watching. Incoming changes are routed to local subscribers by the columns in
+    ROUTING_COLUMNS. Delivery never blocks: a subscriber whose queue is full is
+    dropped and has to reconnect, so one slow client cannot hold up the rest.
+
+    If the upstream socket drops, every subscriber is dropped too, since changes made
+    meanwhile are never delivered; their clients reconnect (the notifications stream
+    replays what was missed). The socket is reopened with backoff and the channels rejoined.
+    """
+
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None,
+                 queue_size: int = REALTIME_CLIENT_QUEUE_SIZE):
+        # Defaults to the Supabase project from settings, resolved on first connect
+        self.url = url
+        self.key = key
+        self.queue_size = queue_size
+        self._client: Optional["AsyncRealtimeClient"] = None
+        self._channels: Dict[str, "AsyncRealtimeChannel"] = {}
+        self._subscribers: Dict[Route, Set[Subscription]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._listener: Optional[asyncio.Task] = None
+        self.dropped_total = 0
+        self.reconnects = 0
+
+    async def _ensure_channel(self, table: str):
+        if table in self._channels:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if table in self._channels:
+                return
+            if self._client is None:
+                from realtime import AsyncRealtimeClient
+
+                settings = get_settings()
+                url = self.url or settings.SUPABASE_URL
+                key = self.key or settings.supabase_key
+                # Reconnects are handled by _listen, which also rejoins the channels
+                client = AsyncRealtimeClient(f"{url}/realtime/v1", token=key, auto_reconnect=False)
+                await client.connect()
+                # Only keep the client once connected, so a failed attempt is retried
+                self._client = client
+                self._listener = asyncio.create_task(self._listen(client))
+            channel = self._client.channel(f"hub:{table}")
+            channel.on_postgres_changes(
+                "*",
+                lambda payload, table=table: self._on_change(table, payload),
+                table=table,
+                schema='public'
+            )
+            await channel.subscribe()
+            self._channels[table] = channel
+
+    async def _listen(self, client: "AsyncRealtimeClient"):
+        delay = 1.0
+        while True:
+            try:
+                # Returns (or raises) once the socket has closed
+                await client.listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Realtime connection lost", exc_info=True)
+            self._drop_all("upstream_reconnect")
+            while True:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, REALTIME_RECONNECT_MAX_SECONDS)
+                try:
+                    await client.connect()
+                    for channel in list(self._channels.values()):
+                        await channel.join()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.warning("Realtime reconnect failed, retrying in %.0fs", delay, exc_info=True)
+                    continue
+                self.reconnects += 1
+                delay = 1.0
+                break
+
+    def _drop_all(self, reason: str):
+        for subscription in {s for subscribers in self._subscribers.values() for s in subscribers}:
+            subscription.drop(reason)
+        self._subscribers.clear()
+
+    def _on_change(self, table: str, payload: Dict[str, Any]):
+        data = payload.get('data', {})
+        record = data.get('record') or data.get('old_record') or {}
+        self.publish(table, {
+            "type": data.get('type'),
+            "table": table,
+            "record": record,
+            "commit_timestamp": data.get('commit_timestamp')
+        })
+
+    def publish(self, table: str, event: Dict):
+        """Route one change to every subscriber whose column value matches"""
+        record = event.get('record') or {}
+        for column in ROUTING_COLUMNS.get(table, ()):
+            value = record.get(column)
+            if value is None:
+                continue
+            for subscription in list(self._subscribers.get((table, column, str(value)), ())):
+                if subscription.dropped:
+                    continue
+                if not subscription.deliver(event):
+                    self.dropped_total += 1
+                    self.unsubscribe(subscription)
+                    subscription.drop()
+
+    async def subscribe(self, *routes: Route) -> Subscription:
+        """Listen on (table, column, value) routes; events from all of them share one queue"""
+        routes = [(table, column, str(value)) for table, column, value in routes]
+        for table, column, _ in routes:
+            if column not in ROUTING_COLUMNS.get(table, ()):
+                raise ValueError(f"{table} changes cannot be routed by {column}")
+            await self._ensure_channel(table)
+        subscription = Subscription(routes, self.queue_size)
+        for route in routes:
+            self._subscribers.setdefault(route, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for route in subscription.routes:
+            subscribers = self._subscribers.get(route)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[route]
+
+    async def stop(self):
+        self._drop_all("shutdown")
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._client is not None and self._client.is_connected:
+            for channel in self._channels.values():
+                await self._client.remove_channel(channel)
+            await self._client.close()
+        self._channels.clear()
+        self._client = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "channels": len(self._channels),
+            "subscribers": len({s for subscribers in self._subscribers.values() for s in subscribers}),
+            "dropped": self.dropped_total,
+            "reconnects": self.reconnects
+        }
+
+realtime_hub = RealtimeHub()
+
+def format_sse(data: Any, event: Optional[str] = None, id: Optional[str] = None) -> str:
+    message = ""
+    if id is not None:
+        message += f"id: {id}\n"
+    if event is not None:
+        message += f"event: {event}\n"
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+async def _sse_events(
+    request: Request,
+    subscription: Subscription,
+    replay: List[Dict],
+    event_id: Optional[Callable[[Dict], str]]
+) -> AsyncIterator[str]:
+    def render(event: Dict) -> str:
+        return format_sse(event, event=event['type'], id=event_id(event) if event_id else None)
+
+    try:
+        for event in replay:
+            yield render(event)
+        # The subscription was open while the replay was read, so skip the overlap
+        replayed = {event['record'].get('id') for event in replay}
+
+        while not await request.is_disconnected():
+            try:
+                event = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except ConnectionResetError as e:
+                # Tell the client to reconnect rather than silently missing events
+                yield format_sse({"reason": str(e)}, event="dropped")
+                return
+            if event is None:
+                yield ": keepalive\n\n"
+            elif event['type'] != 'INSERT' or event['record'].get('id') not in replayed:
+                yield render(event)
+    finally:
+        realtime_hub.unsubscribe(subscription)
+
+def sse_response(
+    request: Request,
+    subscription: Subscription,
+    replay: Optional[List[Dict]] = None,
+    event_id: Optional[Callable[[Dict], str]] = None
+) -> StreamingResponse:
+    """
+    Stream a hub subscription to the browser as Server-Sent Events.
+    `replay` events (e.g. missed since Last-Event-ID) are sent first; `event_id`
+    gives each event the id the browser sends back when it reconnects.
+    """
+    return StreamingResponse(
+        _sse_events(request, subscription, replay or [], event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
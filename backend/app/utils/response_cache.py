@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from .cache import TTLCache, VersionCounters
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "5000"))
+# Repeated failures while a shared backend is down are logged at most this often
+BACKEND_ERROR_LOG_INTERVAL = 10.0
+
+logger = logging.getLogger(__name__)
+
+_last_failure_log = 0.0
+
+def log_backend_failure(operation: str) -> None:
+    global _last_failure_log
+    now = time.monotonic()
+    if now - _last_failure_log >= BACKEND_ERROR_LOG_INTERVAL:
+        _last_failure_log = now
+        logger.warning("Cache backend %s failed; serving without it", operation, exc_info=True)
+
+async def guarded(operation: str, call: Awaitable, fallback: Any = None) -> Any:
+    """
+    Await a backend call, returning `fallback` if the backend fails. Callers treat that
+    as a miss, so an outage of a shared backend degrades them to local caches and the
+    database instead of failing requests.
+    """
+    try:
+        return await call
+    except Exception:
+        log_backend_failure(operation)
+        return fallback
+
+class CacheBackend:
+    """Storage used by ResponseCache. Implement this to share cached responses between processes."""
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+class InMemoryBackend(CacheBackend):
+    """Per-process backend; the default"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_MAXSIZE):
+        self._entries = TTLCache(maxsize=maxsize)
+        # Generation counters are bounded separately and never roll back when dropped
+        self._counters = VersionCounters(maxsize=maxsize)
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._entries.set(key, value, ttl=ttl)
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key)
+
+    async def incr(self, key: str) -> int:
+        return self._counters.bump(key)
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+def make_etag(data: Any) -> str:
+    body = json.dumps(jsonable_encoder(data), sort_keys=True, separators=(',', ':'))
+    return '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the client's If-None-Match already names this representation"""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(',')]
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+def not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """A bodiless 304 when the client's If-None-Match already names this representation"""
+    if etag and etag_matches(request, etag):
+        return Response(status_code=304, headers={'ETag': etag})
+    return None
+
+class ResponseCache:
+    """
+    Caches JSON-serializable route data per namespace (e.g. one namespace per group).
+
+    Every key embeds the namespace's generation number, so invalidating a namespace
+    is a single counter bump that orphans all of its entries (any search/page variant)
+    and lets them age out of the backend.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend or InMemoryBackend()
+        self.ttl = ttl
+
+    def configure(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+    async def get(self, namespace: str, *parts: Any) -> Optional[Tuple[Any, str]]:
+        """Return (data, etag) or None"""
+        return await self._load(await self._key(namespace, parts))
+
+    async def set(self, namespace: str, parts: Tuple, data: Any) -> str:
+        """Store data and return its ETag"""
+        return await self._store(await self._key(namespace, parts), data)
+
+    async def get_or_fetch(self, namespace: str, parts: Tuple, fetch: Callable[[], Awaitable[Any]]) -> Tuple[Any, Optional[str]]:
+        """Return cached (data, etag), calling `fetch` on a miss. None results are not cached."""
+        # One key for both lookup and store: if the namespace is invalidated while
+        # fetch() runs, the result lands under the retired generation and is never served
+        key = await guarded("read", self._key(namespace, parts))
+        if key is not None:
+            cached = await guarded("read", self._load(key))
+            if cached is not None:
+                return cached
+        data = await fetch()
+        if data is None:
+            return None, None
+        data = jsonable_encoder(data)
+        etag = await guarded("write", self._store(key, data)) if key is not None else None
+        return data, etag or make_etag(data)
+
+    async def invalidate(self, namespace: str) -> None:
+        # If a shared backend is down, its entries for the namespace live out their TTL
+        await guarded("invalidate", self.backend.incr(f"gen:{namespace}"))
+
+    def stats(self) -> dict:
+        stats = getattr(self.backend, 'stats', None)
+        return stats() if stats else {}
+
+    async def _load(self, key: str) -> Optional[Tuple[Any, str]]:
+        raw = await self.backend.get(key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry['data'], entry['etag']
+
+    async def _store(self, key: str, data: Any) -> str:
+        data = jsonable_encoder(data)
+        etag = make_etag(data)
+        await self.backend.set(key, json.dumps({'data': data, 'etag': etag}), self.ttl)
+        return etag
+
+    async def _key(self, namespace: str, parts: Tuple) -> str:
+        generation = await self.backend.get_counter(f"gen:{namespace}")
+        suffix = ':'.join('' if part is None else str(part) for part in parts)
+        return f"{namespace}:v{generation}:{suffix}"
+
+response_cache = ResponseCache()
+
+PUBLIC_GROUPS_NAMESPACE = "groups:public"
+
+def group_namespace(group_id: str) -> str:
+    return f"group:{group_id}"
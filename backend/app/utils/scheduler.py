@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import os
+import random
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+
+class PeriodicTask:
+    """Run an async job every `interval` seconds until stopped"""
+
+    def __init__(self, name: str, interval: float, job: Callable[[], Awaitable]):
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        # First run at startup, so a restart doesn't push the job a whole interval back
+        while True:
+            try:
+                await self.job()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # One failed run must not stop the schedule
+                logger.exception("Scheduled job %s failed", self.name)
+            # Jitter keeps workers that started together from firing in lockstep
+            await asyncio.sleep(self.interval * (1 + random.uniform(-SCHEDULER_JITTER, SCHEDULER_JITTER)))
+
+class Scheduler:
+    """
+    In-process scheduler for periodic jobs. Every worker runs its own copy, so
+    jobs that must run once cluster-wide elect a leader in the database.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, PeriodicTask] = {}
+
+    def add(self, name: str, interval: float, job: Callable[[], Awaitable]):
+        self._tasks[name] = PeriodicTask(name, interval, job)
+
+    async def start(self):
+        for task in self._tasks.values():
+            task.start()
+
+    async def stop(self):
+        await asyncio.gather(*[task.stop() for task in self._tasks.values()])
+
+scheduler = Scheduler()
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from .response_cache import CacheBackend, InMemoryBackend, RESPONSE_CACHE_MAXSIZE, guarded, log_backend_failure
+
+logger = logging.getLogger(__name__)
+
+# redis://host:6379/0 (or any Redis-protocol server) to share state between workers;
+# empty keeps everything in-process, which is right for a single worker
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+SHARED_STATE_PREFIX = os.getenv("SHARED_STATE_PREFIX", "hand:")
+# Per-command socket timeout; an unreachable server costs a request at most this much
+SHARED_STATE_TIMEOUT = float(os.getenv("SHARED_STATE_TIMEOUT_SECONDS", "0.5"))
+
+INVALIDATION_CHANNEL = "invalidate"
+
+class SharedState(CacheBackend):
+    """
+    State shared by every worker: a string key/value store with TTLs and counters
+    (enough to back ResponseCache), plus invalidation messages.
+
+    publish() reaches every worker's handlers for that topic, including the sender's,
+    so a cache can invalidate by publishing and handle its own message like any other.
+    """
+
+    # Whether other processes see the same keys; per-process caches only use the
+    # store as a second level when it is actually shared
+    distributed = False
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+
+    def subscribe(self, topic: str, handler: Callable[[str], None]) -> None:
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def _dispatch(self, topic: str, value: str) -> None:
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(value)
+            except Exception:
+                logger.warning("Error handling %s invalidation", topic, exc_info=True)
+
+    async def publish(self, topic: str, value: str) -> None:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+class InMemoryState(InMemoryBackend, SharedState):
+    """Single-process state; publish() calls the local handlers directly"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_MAXSIZE):
+        InMemoryBackend.__init__(self, maxsize)
+        SharedState.__init__(self)
+
+    async def publish(self, topic: str, value: str) -> None:
+        self._dispatch(topic, value)
+
+class RedisState(SharedState):
+    """
+    State in a Redis-protocol server (Redis, Valkey, KeyDB, ...), with invalidations
+    fanned out over pub/sub. Needs the redis package.
+    """
+
+    distributed = True
+
+    def __init__(self, url: str, prefix: str = SHARED_STATE_PREFIX):
+        super().__init__()
+        self.url = url
+        self.prefix = prefix
+        # Imported here so single-worker deployments never load the client; from_url
+        # does not connect, so constructing this at import time is still safe
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            aioredis = None
+        self._redis = None
+        self._subscriber = None
+        if aioredis is not None:
+            self._redis = aioredis.from_url(
+                url, decode_responses=True,
+                socket_timeout=SHARED_STATE_TIMEOUT, socket_connect_timeout=SHARED_STATE_TIMEOUT
+            )
+            # The subscription idles between messages, so it gets no read timeout
+            self._subscriber = aioredis.from_url(url, decode_responses=True, socket_connect_timeout=SHARED_STATE_TIMEOUT)
+        self._listener: Optional[asyncio.Task] = None
+        self.published = 0
+        self.received = 0
+        self.listening = False
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        if ttl > 0:
+            await self._redis.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self._redis.get(self.prefix + key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self._redis.incr(self.prefix + key)
+
+    async def publish(self, topic: str, value: str) -> None:
+        self.published += 1
+        await self._redis.publish(self.prefix + INVALIDATION_CHANNEL, json.dumps({"topic": topic, "value": value}))
+
+    async def start(self) -> None:
+        if self._redis is None:
+            raise RuntimeError("SHARED_STATE_URL is set but the redis package is missing: pip install -r requirements.txt")
+        # The listener connects in the background, so a worker still starts (on its
+        # local caches) while the server is unreachable
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        delay = 1.0
+        while True:
+            pubsub = self._subscriber.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.prefix + INVALIDATION_CHANNEL)
+                self.listening = True
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    self.received += 1
+                    payload = json.loads(message["data"])
+                    self._dispatch(payload["topic"], payload["value"])
+            except (asyncio.CancelledError, GeneratorExit):
+                raise
+            except Exception:
+                # Reconnect with backoff; invalidations sent meanwhile are missed and the
+                # affected entries live out their TTLs
+                log_backend_failure("subscription")
+            finally:
+                self.listening = False
+                await pubsub.aclose()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        for client in (self._redis, self._subscriber):
+            if client is not None:
+                await client.aclose()
+
+    def stats(self) -> dict:
+        return {"published": self.published, "received": self.received, "listening": self.listening}
+
+def create_shared_state(url: str = SHARED_STATE_URL) -> SharedState:
+    return RedisState(url) if url else InMemoryState()
+
+shared_state = create_shared_state()
+
+_pending: Set[asyncio.Task] = set()
+
+def publish_soon(topic: str, value: str, before: Optional[Callable] = None) -> None:
+    """
+    Publish an invalidation from synchronous code: scheduled on the running loop, or
+    handled locally straight away when there is no loop (scripts). `before` is an
+    optional coroutine function to run first, e.g. to bump a version.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        shared_state._dispatch(topic, value)
+        return
+
+    async def send():
+        try:
+            if before is not None:
+                await before()
+            await shared_state.publish(topic, value)
+        except Exception:
+            # Other workers keep their copy until its TTL runs out
+            log_backend_failure(f"{topic} invalidation")
+
+    task = loop.create_task(send())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+async def get_versioned(key: str) -> Optional[Tuple[Any, float]]:
+    """
+    (value, expires_at) stored by set_versioned, or None if missing or if its version
+    counter has moved on since it was written
+    """
+    raw = await guarded("read", shared_state.get(key))
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    if await read_counter(entry["version_key"]) != entry["version"]:
+        return None
+    return entry["value"], entry["expires_at"]
+
+async def read_counter(key: str) -> Optional[int]:
+    """A version counter, or None if the store is unreachable"""
+    return await guarded("read", shared_state.get_counter(key))
+
+async def set_versioned(key: str, value: Any, ttl: float, version_key: str, version: Optional[int]) -> None:
+    """
+    Store a value tagged with the version it was read under; incr(version_key) retires
+    it. A None version (the store was unreachable when it was read) stores nothing.
+    """
+    if ttl <= 0 or version is None:
+        return
+    await guarded("write", shared_state.set(key, json.dumps({
+        "value": value,
+        "version_key": version_key,
+        "version": version,
+        "expires_at": time.time() + ttl,
+    }, default=str), ttl))
@@ -1,7 +1,6 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, Any
 from fastapi import HTTPException
-import supabase
 
 class BetValidator:
     @staticmethod
@@ -25,18 +24,22 @@ class BetValidator:
         return True
 
     @staticmethod
-    def check_deadlines(bet_id: str) -> bool:
-        try:
-            bet = supabase.table('bets')\
-                .select('*')\
-                .eq('id', bet_id)\
-                .single()\
-                .execute()
-                
-            if bet.data and bet.data.get('verification_deadline'):
-                if datetime.now() > bet.data['verification_deadline']:
-                    raise HTTPException(status_code=400, detail="Verification deadline has passed")
-                    
+    def check_deadlines(record: Dict[str, Any]) -> bool:
+        """
+        Check a bet or proof row the caller already loaded. Overdue rows are
+        expired in bulk by the deadline sweeper, so this only covers the gap
+        between sweeps.
+        """
+        deadline = record.get('verification_deadline')
+        if not deadline:
             return True
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+
+        if isinstance(deadline, str):
+            deadline = datetime.fromisoformat(deadline.replace('Z', '+00:00'))
+        if deadline.tzinfo is None:
+            deadline = deadline.replace(tzinfo=timezone.utc)
+
+        if datetime.now(timezone.utc) > deadline:
+            raise HTTPException(status_code=400, detail="Verification deadline has passed")
+
+        return True
@@ -0,0 +1,50 @@
+"""
+Check BetValidator.check_deadlines against the deadline formats rows come back in.
+
+Deadlines arrive as aware datetimes, naive datetimes (read as UTC) or ISO strings
+with a Z or numeric offset; a row without a deadline never expires. Prints each
+case and fails if any of them gives the wrong answer.
+
+    python -m benchmarks.deadlines
+"""
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Tuple
+
+from fastapi import HTTPException
+
+from app.utils.validators import BetValidator
+
+def _cases() -> List[Tuple[str, Any, bool]]:
+    """(name, verification_deadline, whether the deadline still holds)"""
+    now = datetime.now(timezone.utc)
+    past, future = now - timedelta(hours=1), now + timedelta(hours=1)
+    return [
+        ("missing deadline", None, True),
+        ("empty deadline", "", True),
+        ("aware datetime, future", future, True),
+        ("aware datetime, past", past, False),
+        ("naive datetime, future", future.replace(tzinfo=None), True),
+        ("naive datetime, past", past.replace(tzinfo=None), False),
+        ("Z string, future", future.strftime("%Y-%m-%dT%H:%M:%S.%fZ"), True),
+        ("Z string, past", past.strftime("%Y-%m-%dT%H:%M:%SZ"), False),
+        ("offset string, future", future.astimezone(timezone(timedelta(hours=-5))).isoformat(), True),
+        ("offset string, past", past.astimezone(timezone(timedelta(hours=9))).isoformat(), False),
+        ("naive string, past", past.replace(tzinfo=None).isoformat(), False),
+    ]
+
+def main() -> int:
+    failures = 0
+    for name, deadline, open_ in _cases():
+        record = {} if deadline is None else {"verification_deadline": deadline}
+        try:
+            BetValidator.check_deadlines(record)
+            passed = open_
+        except HTTPException as e:
+            passed = not open_ and e.status_code == 400
+        failures += not passed
+        print(f"{'ok  ' if passed else 'FAIL'} {name}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Check that importing the app stays cheap and side-effect free.
+
+Imports main in fresh interpreters with the Supabase and Firebase settings blanked,
+so the import has to succeed without credentials. Fails if the median import time is
+over budget, if the import created a Supabase client or a Firebase app, or if it
+loaded the Redis client without SHARED_STATE_URL set.
+
+    python -m benchmarks.import_time                      # 5 runs, 1500ms budget
+    python -m benchmarks.import_time --budget-ms 800 --top 15
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Blank rather than unset, so load_dotenv() cannot fill them in from a local .env
+BLANKED_SETTINGS = (
+    "SHARED_STATE_URL", "SUPABASE_URL", "SUPABASE_SERVICE_KEY", "SUPABASE_KEY", "FIREBASE_CREDENTIALS_PATH",
+    "FIREBASE_PROJECT_ID", "FIREBASE_PRIVATE_KEY", "FIREBASE_CLIENT_EMAIL", "GOOGLE_APPLICATION_CREDENTIALS",
+)
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed_ms = (time.perf_counter() - started) * 1000
+import firebase_admin
+from app.config import supabase_setup
+print(json.dumps({
+    "elapsed_ms": elapsed_ms,
+    "supabase_client": supabase_setup._client is not None,
+    "firebase_apps": len(firebase_admin._apps),
+    "redis_loaded": "redis" in sys.modules,
+}))
+"""
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def run_once() -> Tuple[Dict, Dict[str, float]]:
+    env = {**os.environ, **{name: "" for name in BLANKED_SETTINGS}}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"importing main failed:\n{result.stderr[-4000:]}")
+
+    # Self time per top-level package, to show where the budget goes
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            package = match.group(4).split(".")[0]
+            packages[package] = packages.get(package, 0) + int(match.group(1)) / 1000
+    return json.loads(result.stdout.strip().splitlines()[-1]), packages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=10, help="packages to list by import time")
+    args = parser.parse_args(argv)
+
+    timings: List[float] = []
+    problems: List[str] = []
+    for _ in range(args.runs):
+        probe, packages = run_once()
+        timings.append(probe["elapsed_ms"])
+        if probe["supabase_client"]:
+            problems.append("importing main created the Supabase client")
+        if probe["firebase_apps"]:
+            problems.append("importing main initialized a Firebase app")
+        if probe["redis_loaded"]:
+            problems.append("importing main loaded the Redis client without SHARED_STATE_URL")
+
+    median = statistics.median(timings)
+    print(f"import main: median {median:.0f}ms, min {min(timings):.0f}ms, max {max(timings):.0f}ms "
+          f"over {args.runs} runs (budget {args.budget_ms:.0f}ms)")
+    print(f"\n{'package':28} {'self ms':>8}  (last run)")
+    for package, ms in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:28} {ms:>8.1f}")
+
+    if median > args.budget_ms:
+        problems.append(f"median import time {median:.0f}ms is over the {args.budget_ms:.0f}ms budget")
+    for problem in dict.fromkeys(problems):
+        print(f"FAIL {problem}")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
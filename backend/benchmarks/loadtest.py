@@ -0,0 +1,409 @@
+"""
+Load test the API in-process against a local Supabase stand-in.
+
+The app runs unmodified under an ASGI transport; Supabase is replaced by
+benchmarks.local_supabase (with a simulated per-call round trip) and Firebase token
+checks by a stub verifier, so nothing leaves the machine and no credentials are needed.
+Virtual users loop over weighted workloads until the duration or request budget is
+spent, and latencies are reported per route.
+
+    python -m benchmarks.loadtest                                   # all workloads, 20s, 50 users
+    python -m benchmarks.loadtest --workloads browse=3,bets=1 --db-latency-ms 5
+    python -m benchmarks.loadtest --requests 5000 --output run.json # record a baseline
+    python -m benchmarks.loadtest --baseline run.json               # exit 1 on a regression
+    python -m benchmarks.loadtest --shared-state-url redis://127.0.0.1:1 --max-error-rate 0
+                                                                    # shared state down: no errors
+
+A regression is a route whose p95 grew by more than --tolerance, or whose error
+rate went up. --max-error-rate fails the run outright if any route's error rate is
+above it, which is how the shared-state outage run checks that requests still succeed.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+import types
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .local_supabase import LocalSupabase, now_iso
+from .stats import summarize
+
+TOKEN_PREFIX = "bench:"
+
+SCALES = {
+    "small": {"users": 200, "groups": 40, "members_per_group": 8, "bets_per_group": 15,
+              "contributions_per_bet": 4, "notifications_per_user": 20},
+    "medium": {"users": 2000, "groups": 400, "members_per_group": 10, "bets_per_group": 25,
+               "contributions_per_bet": 6, "notifications_per_user": 50},
+}
+
+def _install_stubs(db: LocalSupabase):
+    """Point the Supabase and Firebase clients at local stand-ins before the app is imported"""
+    os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "local-service-key")
+
+    import supabase
+    supabase.create_client = lambda *args, **kwargs: db
+
+    import firebase_admin
+    from firebase_admin import auth
+
+    def verify_id_token(token, *args, **kwargs):
+        if not token.startswith(TOKEN_PREFIX):
+            raise auth.InvalidIdTokenError("Unknown benchmark token", cause=None, http_response=None)
+        uid = token[len(TOKEN_PREFIX):]
+        return {"uid": uid, "email": f"{uid}@bench.local", "name": uid}
+
+    def get_user(uid, *args, **kwargs):
+        return types.SimpleNamespace(uid=uid, display_name=uid, email=f"{uid}@bench.local")
+
+    def get_users(identifiers, *args, **kwargs):
+        return types.SimpleNamespace(users=[get_user(i.uid) for i in identifiers], not_found=[])
+
+    auth.verify_id_token = verify_id_token
+    auth.get_user = get_user
+    auth.get_users = get_users
+
+    # Credentials are resolved lazily, so an app without them is fine while no Google API is called
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        firebase_admin.initialize_app(options={"projectId": "hand-bench"})
+
+def seed(db: LocalSupabase, scale: Dict[str, int], rng: random.Random) -> Dict:
+    """Load users, groups, memberships, bets, contributions and notifications"""
+    users = db.insert('users', [{
+        "firebase_uid": f"fb_{n}",
+        "email": f"fb_{n}@bench.local",
+        "username": f"user{n}",
+        # Premium so the create-group workload is not capped at one group per user
+        "premium_expires_at": now_iso(timedelta(days=30)),
+        "is_premium": True,
+    } for n in range(scale["users"])])
+
+    members_by_group = {}
+    groups_by_user = {user['id']: [] for user in users}
+    for n in range(scale["groups"]):
+        members = rng.sample(users, scale["members_per_group"])
+        creator = members[0]
+        group = db.insert('groups', [{
+            "name": f"group {n}",
+            "is_private": n % 2 == 0,
+            "firebase_uid": creator['firebase_uid'],
+            "created_by": creator['id'],
+            "created_at": now_iso(timedelta(seconds=n)),
+        }])[0]
+        db.insert('group_members', [
+            {"group_id": group['id'], "user_id": member['id'], "is_admin": member is creator}
+            for member in members
+        ])
+        creator['groups_created'] += 1
+        members_by_group[group['id']] = [member['id'] for member in members]
+        for member in members:
+            groups_by_user[member['id']].append(group['id'])
+
+    bets_by_group = {}
+    for g, (group_id, member_ids) in enumerate(members_by_group.items()):
+        bets = db.insert('bets', [{
+            "group_id": group_id,
+            "creator_id": rng.choice(member_ids),
+            "description": f"group {g} bet {n}",
+            "reward_type": "coffee",
+            "target_quantity": 10,
+            "bet_type": "one_to_many",
+            "created_at": now_iso(timedelta(seconds=n)),
+        } for n in range(scale["bets_per_group"])])
+        bets_by_group[group_id] = [bet['id'] for bet in bets]
+        db.insert('bet_contributions', [
+            {"bet_id": bet['id'], "user_id": rng.choice(member_ids), "quantity": 1, "bet_side": "for"}
+            for bet in bets for _ in range(scale["contributions_per_bet"])
+        ])
+
+    db.insert('notifications', [
+        {"user_id": user['id'], "type": "WITNESS_REQUIRED", "message": "Your verification is needed for a bet",
+         "read": n % 3 == 0}
+        for user in users for n in range(scale["notifications_per_user"])
+    ])
+
+    return {
+        "users": [user for user in users if groups_by_user[user['id']]],
+        "groups_by_user": groups_by_user,
+        "members_by_group": members_by_group,
+        "bets_by_group": bets_by_group,
+        "tokens": {user['id']: TOKEN_PREFIX + user['firebase_uid'] for user in users},
+        "join_codes": [g['join_code'] for g in db.tables['groups'] if not g['is_private']],
+    }
+
+class Recorder:
+    """Latency samples and error counts per route template"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def request(self, client: httpx.AsyncClient, method: str, route: str, url: str,
+                      token: Optional[str] = None, expected: Tuple[int, ...] = (),
+                      **kwargs) -> Optional[httpx.Response]:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        name = f"{method} {route}"
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers=headers, **kwargs)
+        except Exception as e:
+            print(f"{name} raised {e!r}")
+            response = None
+        self.samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        if response is None or (response.status_code >= 400 and response.status_code not in expected):
+            self.errors[name] = self.errors.get(name, 0) + 1
+            return None
+        return response
+
+    @property
+    def total(self) -> int:
+        return sum(len(samples) for samples in self.samples.values())
+
+class VirtualUser:
+    def __init__(self, fixtures: Dict, rng: random.Random):
+        self.fixtures = fixtures
+        self.rng = rng
+        user = rng.choice(fixtures["users"])
+        self.user_id = user['id']
+        self.token = fixtures["tokens"][user['id']]
+
+    def group(self) -> str:
+        return self.rng.choice(self.fixtures["groups_by_user"][self.user_id])
+
+    def bets(self, group_id: str, count: int) -> List[str]:
+        return self.rng.sample(self.fixtures["bets_by_group"][group_id], count)
+
+# Workloads: each is one user journey, a short sequence of requests
+
+async def auth_workload(client, rec: Recorder, vu: VirtualUser):
+    await rec.request(client, "GET", "/api/users/me", "/api/users/me", vu.token)
+
+async def users_workload(client, rec: Recorder, vu: VirtualUser):
+    response = await rec.request(client, "GET", "/api/users/get-users", "/api/users/get-users", vu.token)
+    cursor = response.headers.get("X-Next-Cursor") if response is not None else None
+    if cursor:
+        await rec.request(client, "GET", "/api/users/get-users", "/api/users/get-users", vu.token,
+                          params={"cursor": cursor})
+    await rec.request(client, "GET", "/api/users/{user_id}", f"/api/users/{vu.user_id}", vu.token)
+
+async def browse_workload(client, rec: Recorder, vu: VirtualUser):
+    group_id = vu.group()
+    await rec.request(client, "GET", "/api/groups/public", "/api/groups/public", vu.token)
+    await rec.request(client, "GET", "/api/groups/{group_id}", f"/api/groups/{group_id}", vu.token)
+    await rec.request(client, "GET", "/api/groups/{group_id}/members", f"/api/groups/{group_id}/members", vu.token)
+    await rec.request(client, "GET", "/api/bets/group/{group_id}", f"/api/bets/group/{group_id}", vu.token)
+    await rec.request(client, "GET", "/api/bets/public/top-bets", "/api/bets/public/top-bets", vu.token)
+
+async def groups_workload(client, rec: Recorder, vu: VirtualUser):
+    await rec.request(client, "POST", "/api/groups/", "/api/groups/", vu.token,
+                      json={"name": f"group by {vu.user_id[:8]}", "is_private": vu.rng.random() < 0.5})
+    join_code = vu.rng.choice(vu.fixtures["join_codes"])
+    # Joining a group the user is already in is a 400 but still a full round of the endpoint
+    await rec.request(client, "POST", "/api/groups/{join_code}/join", f"/api/groups/{join_code}/join", vu.token,
+                      expected=(400,))
+
+async def bets_workload(client, rec: Recorder, vu: VirtualUser):
+    group_id = vu.group()
+    response = await rec.request(client, "POST", "/api/bets/one-to-many", "/api/bets/one-to-many", vu.token, json={
+        "creator_id": vu.user_id,
+        "group_id": group_id,
+        "description": "first to the gym buys coffee",
+        "reward_type": "coffee",
+        "target_quantity": 10,
+        "bet_type": "one_to_many",
+    })
+    if response is not None:
+        vu.fixtures["bets_by_group"][group_id].append(response.json()['id'])
+    await rec.request(client, "POST", "/api/bets/contribute/batch", "/api/bets/contribute/batch", vu.token, json={
+        "contributions": [{"bet_id": bet_id, "quantity": 1} for bet_id in vu.bets(group_id, 3)]
+    })
+    bet_id = vu.bets(group_id, 1)[0]
+    await rec.request(client, "GET", "/api/bets/{bet_id}", f"/api/bets/{bet_id}", vu.token)
+
+async def proofs_workload(client, rec: Recorder, vu: VirtualUser):
+    group_id = vu.group()
+    # Submitting fans WITNESS_REQUIRED out to every member through the notification dispatcher
+    response = await rec.request(client, "POST", "/api/proofs/submit", "/api/proofs/submit", vu.token, json={
+        "bet_id": vu.bets(group_id, 1)[0],
+        "proof_image_url": "http://storage.local/proofs/bench.jpg",
+        "required_witnesses": 2,
+        "verification_deadline": now_iso(timedelta(days=1)),
+    })
+    if response is None:
+        return
+    proof_id = response.json()['id']
+    witnesses = [m for m in vu.fixtures["members_by_group"][group_id] if m != vu.user_id]
+    for witness_id in vu.rng.sample(witnesses, min(2, len(witnesses))):
+        await rec.request(client, "POST", "/api/proofs/{proof_id}/verify", f"/api/proofs/{proof_id}/verify",
+                          vu.fixtures["tokens"][witness_id],
+                          json={"proof_id": proof_id, "verified": True, "comment": None})
+
+async def notifications_workload(client, rec: Recorder, vu: VirtualUser):
+    await rec.request(client, "GET", "/api/notifications/", "/api/notifications/", vu.token,
+                      params={"user_id": vu.user_id})
+    await rec.request(client, "GET", "/api/notifications/unread-count", "/api/notifications/unread-count", vu.token)
+
+WORKLOADS = {
+    "auth": auth_workload,
+    "users": users_workload,
+    "browse": browse_workload,
+    "groups": groups_workload,
+    "bets": bets_workload,
+    "proofs": proofs_workload,
+    "notifications": notifications_workload,
+}
+
+def parse_workloads(spec: str) -> Dict[str, float]:
+    """'browse=3,bets' -> {'browse': 3.0, 'bets': 1.0}"""
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in WORKLOADS:
+            raise argparse.ArgumentTypeError(f"unknown workload {name!r}; choose from {', '.join(WORKLOADS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+async def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    db = LocalSupabase(latency=args.db_latency_ms / 1000)
+    _install_stubs(db)
+    from main import app
+
+    fixtures = seed(db, SCALES[args.scale], rng)
+    weights = parse_workloads(args.workloads)
+    names, cumulative = list(weights), list(weights.values())
+    recorder = Recorder()
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Warm the token cache so the measured run is steady-state rather than first-login
+            warmup = Recorder()
+            for user in fixtures["users"]:
+                await warmup.request(client, "GET", "/api/users/me", "/api/users/me", fixtures["tokens"][user['id']])
+
+            db.calls = 0
+            deadline = time.perf_counter() + args.duration
+
+            async def virtual_user(n: int):
+                vu = VirtualUser(fixtures, random.Random(args.seed + n))
+                while time.perf_counter() < deadline and (not args.requests or recorder.total < args.requests):
+                    workload = WORKLOADS[vu.rng.choices(names, cumulative)[0]]
+                    await workload(client, recorder, vu)
+
+            started = time.perf_counter()
+            await asyncio.gather(*[virtual_user(n) for n in range(args.concurrency)])
+            elapsed = time.perf_counter() - started
+
+    routes = {}
+    for name, samples in sorted(recorder.samples.items()):
+        routes[name] = {
+            "requests": len(samples),
+            "errors": recorder.errors.get(name, 0),
+            "rps": round(len(samples) / elapsed, 1),
+            "latency_ms": summarize(samples),
+        }
+    return {
+        "config": {key: getattr(args, key) for key in ("scale", "workloads", "concurrency", "db_latency_ms", "seed")},
+        "elapsed_s": round(elapsed, 2),
+        "requests": recorder.total,
+        "rps": round(recorder.total / elapsed, 1),
+        "db_calls_per_request": round(db.calls / max(recorder.total, 1), 2),
+        "routes": routes,
+    }
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    problems = []
+    for name, route in results["routes"].items():
+        before = baseline["routes"].get(name)
+        if before is None:
+            continue
+        old_p95 = before["latency_ms"]["p95"]
+        new_p95 = route["latency_ms"]["p95"]
+        # Ignore sub-millisecond noise
+        if new_p95 > old_p95 * (1 + tolerance) and new_p95 - old_p95 > 1.0:
+            problems.append(f"{name}: p95 {old_p95}ms -> {new_p95}ms")
+        old_rate = before["errors"] / max(before["requests"], 1)
+        new_rate = route["errors"] / max(route["requests"], 1)
+        if new_rate > old_rate + 0.01:
+            problems.append(f"{name}: error rate {old_rate:.1%} -> {new_rate:.1%}")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", default=",".join(WORKLOADS),
+                        help="comma-separated workloads, optionally weighted: browse=3,bets=1")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to run for")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="simulated Supabase round trip")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p95 growth (0.5 = +50%%)")
+    parser.add_argument("--shared-state-url", help="run the app against this SHARED_STATE_URL")
+    parser.add_argument("--max-error-rate", type=float, help="fail if any route's error rate is above this")
+    args = parser.parse_args(argv)
+
+    try:
+        parse_workloads(args.workloads)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    # The app logs every request; keep that out of the report (and the timings) unless asked for.
+    # LOG_LEVEL is read when the app is imported, which run() does.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.shared_state_url:
+        os.environ["SHARED_STATE_URL"] = args.shared_state_url
+    if not args.verbose:
+        os.environ["LOG_LEVEL"] = "WARNING"
+        logging.getLogger("hand.requests").setLevel(logging.WARNING)
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        results = asyncio.run(run(args))
+
+    print(f"\n{'route':40} {'reqs':>7} {'errs':>5} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, route in results["routes"].items():
+        latency = route["latency_ms"]
+        print(f"{name:40} {route['requests']:>7} {route['errors']:>5} {route['rps']:>7} "
+              f"{latency['p50']:>8} {latency['p95']:>8} {latency['p99']:>8}")
+    print(f"\n{results['requests']} requests in {results['elapsed_s']}s ({results['rps']} rps), "
+          f"{results['db_calls_per_request']} Supabase calls per request")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.max_error_rate is not None:
+        failing = [name for name, route in results["routes"].items()
+                   if route["errors"] > args.max_error_rate * route["requests"]]
+        for name in failing:
+            print(f"ERRORS {name}: {results['routes'][name]['errors']} of {results['routes'][name]['requests']}")
+        if failing:
+            return 1
+
+    if args.baseline:
+        problems = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
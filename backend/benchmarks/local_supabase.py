@@ -0,0 +1,511 @@
+"""
+In-process stand-in for the Supabase client (PostgREST tables, RPCs and Storage).
+
+Covers the slice of the client API the routers use, with the database-side behaviour
+they rely on (triggers, views, RPCs) reimplemented in Python. Each call sleeps for a
+configurable latency to model the network round trip, so calls-per-request shows up
+in the measured latencies the way it would against a real project.
+"""
+import copy
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from postgrest import APIError
+
+def now_iso(offset: timedelta = timedelta()) -> str:
+    return (datetime.now(timezone.utc) + offset).isoformat()
+
+# Forward embeds: embedded table -> the column on the parent row that references it
+FOREIGN_KEYS = {
+    'users': ('user_id', 'creator_id', 'witness_id'),
+    'groups': ('group_id',),
+    'bets': ('bet_id',),
+}
+
+def _error(code: str, message: str) -> APIError:
+    return APIError({"code": code, "message": message, "details": None, "hint": None})
+
+class Result:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+class Query:
+    """Chainable imitation of a postgrest request builder"""
+
+    _KEYSET = re.compile(
+        r'(\w+)\.(lt|gt)\."([^"]*)",and\((\w+)\.eq\."([^"]*)",(\w+)\.(lt|gt)\."([^"]*)"\)'
+    )
+
+    def __init__(self, db: "LocalSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.op = 'select'
+        self.columns = '*'
+        self.filters: List[Callable[[Dict], bool]] = []
+        self.orders = []
+        self._limit = None
+        self._offset = 0
+        self._single = False
+        self._maybe_single = False
+        self.payload = None
+
+    @property
+    def path(self) -> str:
+        return f"/{self.table}"
+
+    @property
+    def http_method(self) -> str:
+        return {'select': 'GET', 'insert': 'POST', 'update': 'PATCH', 'delete': 'DELETE'}[self.op]
+
+    def select(self, *columns, count=None):
+        self.columns = ','.join(columns) if columns else '*'
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.op, self.payload = 'insert', payload
+        return self
+
+    def upsert(self, payload, **kwargs):
+        self.op, self.payload = 'insert', payload
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = 'update', payload
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    def _filter(self, predicate: Callable[[Dict], bool]):
+        self.filters.append(predicate)
+        return self
+
+    def eq(self, column, value):
+        if isinstance(value, bool):
+            return self._filter(lambda row: row.get(column) is value)
+        return self._filter(lambda row: str(row.get(column)) == str(value))
+
+    def neq(self, column, value):
+        return self._filter(lambda row: str(row.get(column)) != str(value))
+
+    def lt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and str(row[column]) < str(value))
+
+    def gt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and str(row[column]) > str(value))
+
+    def in_(self, column, values):
+        values = {str(value) for value in values}
+        return self._filter(lambda row: str(row.get(column)) in values)
+
+    def ilike(self, column, pattern):
+        regex = re.compile('^' + re.escape(pattern).replace('%', '.*') + '$', re.IGNORECASE)
+        return self._filter(lambda row: bool(regex.match(str(row.get(column) or ''))))
+
+    def or_(self, expression):
+        # Only the keyset form built by app.utils.pagination.keyset_page is needed
+        match = self._KEYSET.match(expression)
+        if not match:
+            raise NotImplementedError(f"or_ filter not supported: {expression}")
+        key, op, value, _, _, tie_key, _, tie_value = match.groups()
+        before = (lambda a, b: a < b) if op == 'lt' else (lambda a, b: a > b)
+        return self._filter(lambda row: before(str(row.get(key)), value) or (
+            str(row.get(key)) == value and before(str(row.get(tie_key)), tie_value)
+        ))
+
+    def order(self, column, desc=False, **kwargs):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count, **kwargs):
+        self._limit = count
+        return self
+
+    def range(self, start, end):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def maybe_single(self):
+        self._maybe_single = True
+        return self
+
+    def _matches(self, row: Dict) -> bool:
+        return all(predicate(row) for predicate in self.filters)
+
+    def _project(self, row: Dict) -> Dict:
+        """Apply the select list, resolving embeds like `bets(description)` or `groups(*)`"""
+        out = {}
+        for embed, sub, plain in re.findall(r'(\w+(?:!\w+)?)\(([^)]*)\)|([\w*]+)', self.columns):
+            if plain:
+                if plain == '*':
+                    out.update(row)
+                elif plain in row:
+                    out[plain] = row[plain]
+                continue
+            name = embed.partition('!')[0]
+            target = None
+            for column in FOREIGN_KEYS.get(name, ()):
+                if column in row:
+                    target = self.db.get(name, row[column])
+                    break
+            if target is None and column not in row:
+                # One-to-many embed, e.g. groups -> group_members
+                back_ref = self.table.rstrip('s') + '_id'
+                out[name] = [copy.deepcopy(r) for r in self.db.rows(name) if str(r.get(back_ref)) == str(row.get('id'))]
+                continue
+            if target is not None and sub.strip() != '*':
+                target = {c.strip(): target.get(c.strip()) for c in sub.split(',')}
+            out[name] = copy.deepcopy(target)
+        return out
+
+    def execute(self) -> Result:
+        self.db.round_trip()
+        with self.db.lock:
+            return self._execute()
+
+    def _execute(self) -> Result:
+        if self.op == 'insert':
+            items = self.payload if isinstance(self.payload, list) else [self.payload]
+            return Result([copy.deepcopy(row) for row in self.db.insert(self.table, items)])
+
+        rows = self.db.rows(self.table)
+        matched = [row for row in rows if self._matches(row)]
+        if self.op == 'update':
+            for row in matched:
+                self.db.update(self.table, row, self.payload)
+            return Result(copy.deepcopy(matched))
+        if self.op == 'delete':
+            self.db.tables[self.table] = [row for row in rows if not self._matches(row)]
+            return Result(copy.deepcopy(matched))
+
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda row: str(row.get(column)), reverse=desc)
+        matched = matched[self._offset:]
+        if self._limit is not None:
+            matched = matched[:self._limit]
+        data = [self._project(row) for row in matched]
+
+        if self._single:
+            if len(data) != 1:
+                raise _error('PGRST116', 'JSON object requested, multiple (or no) rows returned')
+            return Result(data[0])
+        if self._maybe_single:
+            return Result(data[0] if data else None)
+        return Result(data, len(data))
+
+class RPC:
+    http_method = 'POST'
+
+    def __init__(self, db: "LocalSupabase", name: str, params: Dict):
+        self.db, self.name, self.params = db, name, params
+        self.path = f"/rpc/{name}"
+
+    def execute(self) -> Result:
+        self.db.round_trip()
+        handler = RPCS.get(self.name)
+        if handler is None:
+            raise _error('PGRST202', f"Could not find the function public.{self.name}")
+        with self.db.lock:
+            return Result(handler(self.db, **self.params))
+
+class Bucket:
+    def __init__(self, db: "LocalSupabase", name: str):
+        self.db, self.name = db, name
+
+    def upload(self, path, file, file_options=None):
+        self.db.round_trip()
+        if isinstance(file, (bytes, bytearray)):
+            data = bytes(file)
+        elif isinstance(file, str):
+            with open(file, 'rb') as f:
+                data = f.read()
+        else:
+            data = file.read()
+        self.db.objects[(self.name, path)] = data
+        return {"Key": f"{self.name}/{path}"}
+
+    def remove(self, paths):
+        self.db.round_trip()
+        for path in paths:
+            self.db.objects.pop((self.name, path), None)
+        return [{"name": path} for path in paths]
+
+    def get_public_url(self, path):
+        return f"http://storage.local/{self.name}/{path}"
+
+class Storage:
+    def __init__(self, db: "LocalSupabase"):
+        self.db = db
+
+    def from_(self, bucket: str) -> Bucket:
+        return Bucket(self.db, bucket)
+
+class _PostgrestStub:
+    """Holds the session app.config.supabase_setup swaps for its pooled one"""
+
+    def __init__(self):
+        self.session = httpx.Client(base_url="http://localhost")
+
+class LocalSupabase:
+    """Enough of supabase.Client for the API, backed by in-memory tables"""
+
+    DEFAULTS = {
+        'users': lambda: {'groups_created': 0, 'premium_expires_at': None, 'auto_renew_premium': False,
+                          'is_premium': False, 'unread_notifications': 0},
+        'groups': lambda: {'join_code': uuid.uuid4().hex[:8].upper(), 'is_private': True},
+        'group_members': lambda: {'is_admin': False, 'joined_at': now_iso()},
+        'bets': lambda: {'is_active': True, 'status': 'active', 'verification_deadline': None,
+                         'required_witnesses': 2, 'current_total': 0, 'total_for': 0, 'total_against': 0},
+        'bet_contributions': lambda: {'bet_side': 'for'},
+        'bet_proofs': lambda: {'verification_status': 'pending', 'current_witnesses': 0,
+                               'proof_thumbnail_url': None, 'submitted_at': now_iso()},
+        'notifications': lambda: {'read': False},
+    }
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict]] = {}
+        self.objects: Dict = {}
+        self.calls = 0
+        self.lock = threading.RLock()
+        self.storage = Storage(self)
+        self.postgrest = _PostgrestStub()
+
+    def round_trip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def table(self, name: str) -> Query:
+        return Query(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict] = None) -> RPC:
+        return RPC(self, name, params or {})
+
+    # Storage-level helpers shared by the query builder, RPCs and seeding
+
+    def rows(self, table: str) -> List[Dict]:
+        view = VIEWS.get(table)
+        if view is not None:
+            return view(self)
+        return self.tables.setdefault(table, [])
+
+    def get(self, table: str, row_id: Any) -> Optional[Dict]:
+        return next((row for row in self.rows(table) if str(row.get('id')) == str(row_id)), None)
+
+    def insert(self, table: str, items: List[Dict]) -> List[Dict]:
+        created = []
+        for item in items:
+            row = {**self.DEFAULTS.get(table, dict)(), **item}
+            row.setdefault('id', str(uuid.uuid4()))
+            row.setdefault('created_at', now_iso())
+            self.tables.setdefault(table, []).append(row)
+            created.append(row)
+        for trigger in TRIGGERS.get(table, ()):
+            trigger(self, created)
+        return created
+
+    def update(self, table: str, row: Dict, changes: Dict):
+        if table == 'notifications' and 'read' in changes and changes['read'] != row.get('read'):
+            user = self.get('users', row['user_id'])
+            if user:
+                user['unread_notifications'] += -1 if changes['read'] else 1
+        row.update(changes)
+
+# Database triggers
+
+def _bet_totals_trigger(db: LocalSupabase, rows: List[Dict]):
+    for row in rows:
+        bet = db.get('bets', row['bet_id'])
+        if bet:
+            bet['current_total'] += row['quantity']
+            side = 'total_against' if row.get('bet_side') == 'against' else 'total_for'
+            bet[side] += row['quantity']
+
+def _unread_count_trigger(db: LocalSupabase, rows: List[Dict]):
+    for row in rows:
+        user = db.get('users', row['user_id'])
+        if user and not row.get('read'):
+            user['unread_notifications'] += 1
+
+TRIGGERS = {
+    'bet_contributions': (_bet_totals_trigger,),
+    'notifications': (_unread_count_trigger,),
+}
+
+# Views
+
+def _public_bets(db: LocalSupabase) -> List[Dict]:
+    public_groups = {str(g['id']): g['name'] for g in db.tables.get('groups', []) if not g['is_private']}
+    return [
+        {**bet, 'group_name': public_groups[str(bet['group_id'])]}
+        for bet in db.tables.get('bets', [])
+        if str(bet['group_id']) in public_groups
+    ]
+
+VIEWS = {'public_bets': _public_bets}
+
+# RPCs (see supabase/migrations for the SQL they stand in for)
+
+def _user_bet_outcomes(db: LocalSupabase, user_id: str) -> List[Dict]:
+    backed = {}
+    for c in db.tables.get('bet_contributions', []):
+        if str(c.get('user_id')) == str(user_id):
+            backed.setdefault(str(c['bet_id']), set()).add(c.get('bet_side') or 'for')
+    verified = {str(p['bet_id']) for p in db.tables.get('bet_proofs', []) if p['verification_status'] == 'verified'}
+    bets = {str(b['id']): b for b in db.tables.get('bets', [])}
+    outcomes = []
+    for bet_id, sides in backed.items():
+        bet = bets.get(bet_id)
+        if bet is None:
+            continue
+        expired = bet.get('status') == 'expired' and bet_id not in verified
+        outcomes.append({
+            "reward_type": bet.get('reward_type'),
+            "target_quantity": bet.get('target_quantity', 1),
+            "won": ('for' in sides and bet_id in verified) or ('against' in sides and expired),
+            "lost": ('for' in sides and expired) or ('against' in sides and bet_id in verified),
+        })
+    return outcomes
+
+def calculate_user_stats(db, user_id):
+    outcomes = _user_bet_outcomes(db, user_id)
+    wins = sum(1 for o in outcomes if o['won'])
+    losses = sum(1 for o in outcomes if o['lost'])
+    rewards = {}
+    for o in outcomes:
+        if o['won'] and o['reward_type'] is not None:
+            rewards[o['reward_type']] = rewards.get(o['reward_type'], 0) + o['target_quantity']
+    return {
+        "total_bets": len(outcomes),
+        "wins": wins,
+        "losses": losses,
+        "win_rate": wins / (wins + losses) if wins + losses else 0,
+        "total_rewards_won": rewards,
+    }
+
+def calculate_users_stats(db, user_ids):
+    rows = []
+    for user_id in user_ids:
+        outcomes = _user_bet_outcomes(db, user_id)
+        rows.append({"user_id": user_id, "total_bets": len(outcomes), "wins": sum(1 for o in outcomes if o['won'])})
+    return rows
+
+def calculate_group_stats(db, group_id):
+    bets = [b for b in db.tables.get('bets', []) if str(b['group_id']) == str(group_id)]
+    return {"total_bets": len(bets), "active_bets": sum(1 for b in bets if b['is_active'])}
+
+def get_hot_public_bets(db, p_limit=20, p_window_hours=24):
+    since = now_iso(-timedelta(hours=p_window_hours))
+    recent = {}
+    for c in db.tables.get('bet_contributions', []):
+        if c['created_at'] >= since:
+            recent[str(c['bet_id'])] = recent.get(str(c['bet_id']), 0) + 1
+    bets = [b for b in _public_bets(db) if str(b['id']) in recent]
+    bets.sort(key=lambda b: recent[str(b['id'])], reverse=True)
+    return bets[:p_limit]
+
+def create_group_with_admin(db, p_user_id, p_name, p_is_private=True):
+    creator = db.get('users', p_user_id)
+    if creator is None:
+        raise _error('PT404', 'User not found')
+    premium = creator.get('premium_expires_at') and creator['premium_expires_at'] > now_iso()
+    if not premium and creator['groups_created'] >= 1:
+        raise _error('PT403', 'Free users can only create 1 group. Upgrade to premium for unlimited groups!')
+    group = db.insert('groups', [{
+        "name": p_name, "is_private": p_is_private,
+        "firebase_uid": creator['firebase_uid'], "created_by": creator['id']
+    }])[0]
+    db.insert('group_members', [{"group_id": group['id'], "user_id": creator['id'], "is_admin": True}])
+    creator['groups_created'] += 1
+    return [copy.deepcopy(group)]
+
+def record_proof_verification(db, p_proof_id, p_witness_id, p_verified, p_comment=None):
+    proof = db.get('bet_proofs', p_proof_id)
+    if proof is None:
+        raise _error('PT404', 'Proof not found')
+    if proof['verification_status'] != 'pending':
+        raise _error('PT409', 'Proof is no longer awaiting verification')
+    bet = db.get('bets', proof['bet_id'])
+    if not any(str(m['group_id']) == str(bet['group_id']) and str(m['user_id']) == str(p_witness_id)
+               for m in db.tables.get('group_members', [])):
+        raise _error('PT403', 'Only group members can verify this proof')
+    if any(str(v['proof_id']) == str(p_proof_id) and str(v['witness_id']) == str(p_witness_id)
+           for v in db.tables.get('proof_verifications', [])):
+        raise _error('PT409', 'You have already verified this proof')
+    db.insert('proof_verifications', [{
+        "proof_id": p_proof_id, "witness_id": p_witness_id, "verified": p_verified, "comment": p_comment
+    }])
+    if p_verified:
+        proof['current_witnesses'] += 1
+        if proof['current_witnesses'] >= proof['required_witnesses']:
+            proof['verification_status'] = 'verified'
+    return [copy.deepcopy(proof)]
+
+def acquire_proof_blob(db, p_content_hash):
+    blob = db.get('proof_blobs', p_content_hash)
+    if blob is None:
+        return []
+    blob['ref_count'] += 1
+    return [copy.deepcopy(blob)]
+
+def register_proof_blob(db, p_content_hash):
+    blob = db.get('proof_blobs', p_content_hash)
+    if blob is None:
+        blob = db.insert('proof_blobs', [{"id": p_content_hash, "content_hash": p_content_hash, "ref_count": 1}])[0]
+    else:
+        blob['ref_count'] += 1
+    return [copy.deepcopy(blob)]
+
+def release_proof_blob(db, p_content_hash):
+    blob = db.get('proof_blobs', p_content_hash)
+    if blob is None:
+        return True
+    blob['ref_count'] -= 1
+    if blob['ref_count'] > 0:
+        return False
+    db.rows('proof_blobs').remove(blob)
+    return True
+
+def sweep_expired_deadlines(db, p_batch_size=500):
+    return {"proofs": [], "bets": []}
+
+def get_due_premium_renewals(db, p_limit=500, p_after=None, p_lead_hours=24, p_max_attempts=3):
+    return []
+
+def apply_premium_renewals(db, p_renewals):
+    return []
+
+def expire_premium_subscriptions(db):
+    return []
+
+def try_acquire_job_lease(db, p_name, p_ttl_seconds):
+    lease = db.get('job_leases', p_name)
+    if lease is not None and lease['expires_at'] > now_iso():
+        return False
+    if lease is None:
+        lease = db.insert('job_leases', [{'id': p_name}])[0]
+    lease['expires_at'] = now_iso(timedelta(seconds=p_ttl_seconds))
+    return True
+
+RPCS = {
+    fn.__name__: fn for fn in (
+        calculate_user_stats, calculate_users_stats, calculate_group_stats, get_hot_public_bets, create_group_with_admin,
+        record_proof_verification, acquire_proof_blob, register_proof_blob, release_proof_blob,
+        sweep_expired_deadlines, get_due_premium_renewals, apply_premium_renewals,
+        expire_premium_subscriptions, try_acquire_job_lease,
+    )
+}
@@ -0,0 +1,118 @@
+-- Stand-in for what a Supabase project provides before the first migration, so the
+-- migrations can run on a plain local Postgres (15+).
+-- Roles and auth.uid() mimic Supabase; the base tables are the ones created in the
+-- dashboard, with the columns the API reads and writes.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        CREATE ROLE anon NOLOGIN;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+        CREATE ROLE authenticated NOLOGIN;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        CREATE ROLE service_role NOLOGIN BYPASSRLS;
+    END IF;
+END
+$$;
+
+CREATE SCHEMA IF NOT EXISTS auth;
+
+-- Supabase reads the caller from the JWT claims PostgREST puts in request.jwt.claim.*
+CREATE OR REPLACE FUNCTION auth.uid()
+RETURNS uuid AS $$
+    SELECT nullif(current_setting('request.jwt.claim.sub', true), '')::uuid;
+$$ LANGUAGE sql STABLE;
+
+GRANT USAGE ON SCHEMA auth TO anon, authenticated, service_role;
+GRANT USAGE ON SCHEMA public TO anon, authenticated, service_role;
+
+CREATE TABLE public.users (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    firebase_uid text,
+    email text,
+    username text,
+    created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE public.groups (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    name text NOT NULL,
+    is_private boolean NOT NULL DEFAULT true,
+    join_code text DEFAULT upper(substring(md5(random()::text) from 1 for 8)),
+    created_by uuid REFERENCES public.users(id) ON DELETE SET NULL,
+    created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE public.group_members (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    group_id uuid NOT NULL REFERENCES public.groups(id) ON DELETE CASCADE,
+    user_id uuid NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+    joined_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE public.bets (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    group_id uuid NOT NULL REFERENCES public.groups(id) ON DELETE CASCADE,
+    creator_id uuid REFERENCES public.users(id) ON DELETE SET NULL,
+    description text,
+    reward_type text,
+    target_quantity integer NOT NULL DEFAULT 1,
+    bet_type text NOT NULL DEFAULT 'one_to_many',
+    is_active boolean NOT NULL DEFAULT true,
+    status text NOT NULL DEFAULT 'pending',
+    required_witnesses integer NOT NULL DEFAULT 2,
+    verification_deadline timestamp with time zone,
+    created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE public.bet_contributions (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    bet_id uuid NOT NULL REFERENCES public.bets(id) ON DELETE CASCADE,
+    user_id uuid REFERENCES public.users(id) ON DELETE SET NULL,
+    quantity integer NOT NULL,
+    bet_side text DEFAULT 'for',
+    created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE public.bet_proofs (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    bet_id uuid NOT NULL REFERENCES public.bets(id) ON DELETE CASCADE,
+    proof_image_url text NOT NULL,
+    verification_status text NOT NULL DEFAULT 'pending',
+    required_witnesses integer NOT NULL DEFAULT 2,
+    current_witnesses integer NOT NULL DEFAULT 0,
+    verification_deadline timestamp with time zone,
+    submitted_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE public.proof_verifications (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    proof_id uuid NOT NULL REFERENCES public.bet_proofs(id) ON DELETE CASCADE,
+    witness_id uuid NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+    verified boolean NOT NULL,
+    comment text,
+    created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE public.notifications (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id uuid NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+    type text NOT NULL,
+    message text,
+    read boolean NOT NULL DEFAULT false,
+    created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Stand-in for the dashboard-defined stats function (20240222_user_bet_outcomes replaces it)
+CREATE OR REPLACE FUNCTION public.calculate_user_stats(user_id uuid)
+RETURNS json AS $$
+    SELECT json_build_object(
+        'total_bets', (SELECT COUNT(*) FROM public.bet_contributions c WHERE c.user_id = $1),
+        'wins', 0
+    );
+$$ LANGUAGE sql STABLE;
+
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON TABLES TO authenticated, service_role;
+GRANT ALL ON ALL TABLES IN SCHEMA public TO authenticated, service_role;
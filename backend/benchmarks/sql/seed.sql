@@ -0,0 +1,117 @@
+-- Synthetic data for the query-plan benchmark. Sizes come from bench.* settings
+-- (set by query_plans.py --scale). setseed keeps runs comparable.
+SELECT setseed(0.42);
+
+-- Seeding inserts members directly, so skip the per-creator limit in handle_new_group_member
+SELECT set_config('hand.creating_group', 'on', false);
+
+INSERT INTO public.users (firebase_uid, email, username, created_at)
+SELECT
+    'fb_' || n,
+    'user' || n || '@example.com',
+    'user' || n,
+    CURRENT_TIMESTAMP - random() * INTERVAL '365 days'
+FROM generate_series(1, current_setting('bench.users')::integer) AS n;
+
+CREATE TEMP TABLE bench_users AS
+SELECT row_number() OVER (ORDER BY id) AS n, id FROM public.users;
+CREATE INDEX ON bench_users (n);
+
+INSERT INTO public.groups (name, is_private, created_by, created_at)
+SELECT
+    'group ' || gs.i,
+    random() < 0.7,
+    u.id,
+    CURRENT_TIMESTAMP - random() * INTERVAL '365 days'
+FROM generate_series(1, current_setting('bench.groups')::integer) AS gs(i)
+JOIN bench_users u ON u.n = 1 + (gs.i * 7919) % current_setting('bench.users')::integer;
+
+-- Creators first so they become admins, then random members
+INSERT INTO public.group_members (group_id, user_id, joined_at)
+SELECT id, created_by, created_at FROM public.groups;
+
+INSERT INTO public.group_members (group_id, user_id, joined_at)
+SELECT DISTINCT ON (s.group_id, u.id) s.group_id, u.id, s.joined_at
+FROM (
+    SELECT
+        g.id AS group_id,
+        g.created_by,
+        1 + floor(random() * current_setting('bench.users')::integer)::integer AS user_n,
+        g.created_at + random() * INTERVAL '30 days' AS joined_at
+    FROM public.groups g
+    CROSS JOIN generate_series(1, current_setting('bench.members_per_group')::integer)
+) s
+JOIN bench_users u ON u.n = s.user_n
+WHERE u.id <> s.created_by;
+
+UPDATE public.users u
+SET groups_created = c.created
+FROM (SELECT created_by, COUNT(*) AS created FROM public.groups GROUP BY created_by) c
+WHERE u.id = c.created_by;
+
+CREATE TEMP TABLE bench_members AS
+SELECT row_number() OVER () AS n, group_id, user_id FROM public.group_members;
+CREATE INDEX ON bench_members (n);
+
+INSERT INTO public.bets (group_id, creator_id, description, reward_type, target_quantity, bet_type, is_active, status, verification_deadline, created_at)
+SELECT
+    m.group_id,
+    m.user_id,
+    'bet ' || s.n,
+    (ARRAY['coffee', 'pushups', 'lunch'])[1 + floor(random() * 3)::integer],
+    1 + floor(random() * 20)::integer,
+    CASE WHEN random() < 0.5 THEN 'one_to_many' ELSE 'many_to_many' END,
+    s.status IN ('pending', 'active'),
+    s.status,
+    s.created_at + INTERVAL '14 days',
+    s.created_at
+FROM (
+    SELECT
+        n,
+        1 + floor(random() * (SELECT COUNT(*) FROM bench_members))::integer AS member_n,
+        (ARRAY['pending', 'active', 'active', 'active', 'completed', 'expired'])[1 + floor(random() * 6)::integer] AS status,
+        CURRENT_TIMESTAMP - random() * INTERVAL '180 days' AS created_at
+    FROM generate_series(1, current_setting('bench.bets')::integer) AS n
+) s
+JOIN bench_members m ON m.n = s.member_n;
+
+CREATE TEMP TABLE bench_bets AS
+SELECT row_number() OVER () AS n, id, created_at FROM public.bets;
+CREATE INDEX ON bench_bets (n);
+
+INSERT INTO public.bet_contributions (bet_id, user_id, quantity, bet_side, created_at)
+SELECT b.id, u.id, 1 + floor(random() * 5)::integer,
+    CASE WHEN random() < 0.6 THEN 'for' ELSE 'against' END,
+    b.created_at + random() * INTERVAL '7 days'
+FROM (
+    SELECT
+        1 + floor(random() * current_setting('bench.bets')::integer)::integer AS bet_n,
+        1 + floor(random() * current_setting('bench.users')::integer)::integer AS user_n
+    FROM generate_series(1, current_setting('bench.contributions')::integer)
+) s
+JOIN bench_bets b ON b.n = s.bet_n
+JOIN bench_users u ON u.n = s.user_n;
+
+INSERT INTO public.bet_proofs (bet_id, proof_image_url, verification_status, verification_deadline, submitted_at)
+SELECT b.id, 'https://example.com/proofs/' || b.id || '.webp',
+    CASE WHEN random() < 0.1 THEN 'pending' ELSE 'verified' END,
+    b.created_at + INTERVAL '14 days',
+    b.created_at + INTERVAL '7 days'
+FROM (
+    SELECT 1 + floor(random() * current_setting('bench.bets')::integer)::integer AS bet_n
+    FROM generate_series(1, current_setting('bench.proofs')::integer)
+) s
+JOIN bench_bets b ON b.n = s.bet_n;
+
+INSERT INTO public.notifications (user_id, type, message, read, created_at)
+SELECT u.id, 'WITNESS_REQUIRED', 'Your verification is needed for a bet', random() < 0.7,
+    CURRENT_TIMESTAMP - random() * INTERVAL '90 days'
+FROM (
+    SELECT 1 + floor(random() * current_setting('bench.users')::integer)::integer AS user_n
+    FROM generate_series(1, current_setting('bench.notifications')::integer)
+) s
+JOIN bench_users u ON u.n = s.user_n;
+
+SELECT set_config('hand.creating_group', 'off', false);
+
+ANALYZE;
@@ -0,0 +1,20 @@
+from typing import Dict, List
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (q in 0-100)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    values = sorted(samples_ms)
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(values[-1], 3) if values else 0.0
+    }
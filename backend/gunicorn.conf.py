@@ -0,0 +1,30 @@
+# Multi-worker launch: gunicorn -c gunicorn.conf.py main:app
+#
+# Each worker is a separate process with its own Supabase client, realtime hub and
+# caches. Set SHARED_STATE_URL (redis://...) so the workers share verified tokens,
+# membership sets and cached responses and see each other's invalidations; without
+# it every worker warms its own caches and only learns of changes through TTLs.
+#
+# The deadline sweep and premium jobs are scheduled in every worker, but one worker
+# runs each at a time: the sweep holds an advisory lock and the premium job a lease.
+# /metrics answers from whichever worker takes the scrape, so it is a per-worker sample.
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Clients are created in each worker's lifespan, so there is nothing to gain from
+# preloading and forked workers must not share the parent's connections
+preload_app = False
+
+# Heartbeat timeout; async workers keep beating while they hold long SSE streams
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Optional recycling to bound slow leaks (0 = never)
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+accesslog = None  # requests are logged by RequestMetricsMiddleware
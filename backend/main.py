@@ -1,42 +1,79 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-from app.api import groups, bets, proofs, users, notifications, analytics, storage
-from app.utils.realtime import RealtimeManager
-from app.utils.validators import BetValidator
-from firebase_admin import credentials, initialize_app, get_app
+from app.api import groups, bets, proofs, users, notifications, analytics, storage, subscriptions, metrics
+from app.config.firebase_app import init_firebase
+from app.config.settings import get_settings
+from app.config.supabase_setup import close_supabase, get_supabase
+from app.utils.realtime import realtime_hub
+from app.utils.notification_dispatcher import notification_dispatcher
+from app.utils.images import shutdown_image_workers
+from app.utils.scheduler import scheduler
+from app.utils.deadlines import DEADLINE_SWEEP_INTERVAL, sweep_expired_deadlines
+from app.utils.premium import PREMIUM_JOB_INTERVAL, run_premium_jobs
+from app.utils.metrics import RequestMetricsMiddleware
+from app.utils.log import configure_logging
+from app.utils.response_cache import response_cache
+from app.utils.shared_state import shared_state
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-try:
-    # Try to get the default app first
-    firebase_app = get_app()
-except ValueError:
-    # Initialize only if it doesn't exist
-    cred = credentials.Certificate("C:/Users/Avinash/Desktop/HAND/backend/handshake-5dd27-firebase-adminsdk-fbsvc-7d7f13a9f1.json")
-    firebase_app = initialize_app(cred)
-
-app = FastAPI()
-
-app.include_router(groups.router, prefix="/api")
-app.include_router(bets.router, prefix="/api")
-app.include_router(proofs.router, prefix="/api")
-app.include_router(users.router, prefix="/api")
-app.include_router(notifications.router, prefix="/api")
-app.include_router(analytics.router, prefix="/api")
-app.include_router(storage.router, prefix="/api")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-@app.get("/")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created here rather than at import, so importing the app is cheap
+    # and needs no credentials; a misconfigured worker still fails before serving
+    init_firebase()
+    get_supabase()
+    # Cross-worker cache invalidation; with SHARED_STATE_URL set, cached responses
+    # live in the shared store too
+    await shared_state.start()
+    response_cache.configure(shared_state)
+    await notification_dispatcher.start()
+    scheduler.add("deadline_sweep", DEADLINE_SWEEP_INTERVAL, sweep_expired_deadlines)
+    scheduler.add("premium_renewal", PREMIUM_JOB_INTERVAL, run_premium_jobs)
+    await scheduler.start()
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+        await realtime_hub.stop()
+        await notification_dispatcher.stop()
+        await shared_state.stop()
+        shutdown_image_workers()
+        close_supabase()
+
+def create_app() -> FastAPI:
+    # Set up logging (queued JSON lines; see app/utils/log.py for the LOG_* settings)
+    configure_logging()
+    settings = get_settings()
+
+    app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG, lifespan=lifespan)
+
+    app.include_router(groups.router, prefix="/api")
+    app.include_router(bets.router, prefix="/api")
+    app.include_router(proofs.router, prefix="/api")
+    app.include_router(users.router, prefix="/api")
+    app.include_router(notifications.router, prefix="/api")
+    app.include_router(analytics.router, prefix="/api")
+    app.include_router(storage.router, prefix="/api")
+    app.include_router(subscriptions.router, prefix="/api")
+    app.include_router(metrics.router)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[origin.strip() for origin in settings.CORS_ORIGINS.split(",")],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Outermost, so request timings include CORS handling
+    app.add_middleware(RequestMetricsMiddleware)
+
+    app.add_api_route("/", read_root, methods=["GET"])
+    app.add_api_route("/ping", ping, methods=["GET"])
+    return app
+
 async def read_root():
     logger.info("Root endpoint accessed")
     try:
@@ -45,7 +82,8 @@ async def read_root():
         logger.error(f"Error in root endpoint: {str(e)}")
         raise
 
-@app.get("/ping")
 async def ping():
     logger.info("Ping endpoint accessed")
     return {"message": "pong"}
+
+app = create_app()
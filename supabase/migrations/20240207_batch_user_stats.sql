@@ -0,0 +1,21 @@
+-- Set-based variant of calculate_user_stats for paginated user listings.
+-- Returns one row per requested user so a whole page costs a single round-trip.
+CREATE OR REPLACE FUNCTION public.calculate_users_stats(user_ids uuid[])
+RETURNS TABLE (
+    user_id uuid,
+    total_bets integer,
+    wins integer
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        ids.id,
+        COALESCE((stats.value->>'total_bets')::integer, 0),
+        COALESCE((stats.value->>'wins')::integer, 0)
+    FROM unnest(user_ids) AS ids(id)
+    CROSS JOIN LATERAL (
+        -- to_jsonb works whether calculate_user_stats returns json or a record
+        SELECT to_jsonb(public.calculate_user_stats(ids.id)) AS value
+    ) AS stats;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER;
@@ -0,0 +1,108 @@
+-- Keep running contribution totals on each bet so reads don't have to SUM bet_contributions
+ALTER TABLE public.bets
+ADD COLUMN IF NOT EXISTS current_total integer NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS total_for integer NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS total_against integer NOT NULL DEFAULT 0;
+
+-- Statement-level so a multi-row insert updates each bet once
+CREATE OR REPLACE FUNCTION public.handle_bet_contribution_totals()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Remove the old rows' contribution (UPDATE and DELETE)
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE public.bets b
+        SET
+            current_total = b.current_total - d.total,
+            total_for = b.total_for - d.total_for,
+            total_against = b.total_against - d.total_against
+        FROM (
+            SELECT
+                bet_id,
+                COALESCE(SUM(quantity), 0) AS total,
+                COALESCE(SUM(quantity) FILTER (WHERE COALESCE(bet_side, 'for') = 'for'), 0) AS total_for,
+                COALESCE(SUM(quantity) FILTER (WHERE bet_side = 'against'), 0) AS total_against
+            FROM old_rows
+            GROUP BY bet_id
+        ) d
+        WHERE b.id = d.bet_id;
+    END IF;
+
+    -- Add the new rows' contribution (INSERT and UPDATE)
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE public.bets b
+        SET
+            current_total = b.current_total + d.total,
+            total_for = b.total_for + d.total_for,
+            total_against = b.total_against + d.total_against
+        FROM (
+            SELECT
+                bet_id,
+                COALESCE(SUM(quantity), 0) AS total,
+                COALESCE(SUM(quantity) FILTER (WHERE COALESCE(bet_side, 'for') = 'for'), 0) AS total_for,
+                COALESCE(SUM(quantity) FILTER (WHERE bet_side = 'against'), 0) AS total_against
+            FROM new_rows
+            GROUP BY bet_id
+        ) d
+        WHERE b.id = d.bet_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS on_bet_contributions_inserted ON public.bet_contributions;
+DROP TRIGGER IF EXISTS on_bet_contributions_updated ON public.bet_contributions;
+DROP TRIGGER IF EXISTS on_bet_contributions_deleted ON public.bet_contributions;
+
+CREATE TRIGGER on_bet_contributions_inserted
+    AFTER INSERT ON public.bet_contributions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.handle_bet_contribution_totals();
+
+CREATE TRIGGER on_bet_contributions_updated
+    AFTER UPDATE ON public.bet_contributions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.handle_bet_contribution_totals();
+
+CREATE TRIGGER on_bet_contributions_deleted
+    AFTER DELETE ON public.bet_contributions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.handle_bet_contribution_totals();
+
+-- Recompute totals from bet_contributions (all bets when p_bet_ids is NULL).
+-- Returns the number of bets whose stored totals had drifted and were fixed.
+CREATE OR REPLACE FUNCTION public.reconcile_bet_totals(p_bet_ids uuid[] DEFAULT NULL)
+RETURNS integer AS $$
+DECLARE
+    fixed integer;
+BEGIN
+    UPDATE public.bets b
+    SET
+        current_total = s.total,
+        total_for = s.total_for,
+        total_against = s.total_against
+    FROM (
+        SELECT
+            bets.id,
+            COALESCE(SUM(c.quantity), 0) AS total,
+            COALESCE(SUM(c.quantity) FILTER (WHERE COALESCE(c.bet_side, 'for') = 'for'), 0) AS total_for,
+            COALESCE(SUM(c.quantity) FILTER (WHERE c.bet_side = 'against'), 0) AS total_against
+        FROM public.bets
+        LEFT JOIN public.bet_contributions c ON c.bet_id = bets.id
+        WHERE p_bet_ids IS NULL OR bets.id = ANY(p_bet_ids)
+        GROUP BY bets.id
+    ) s
+    WHERE b.id = s.id
+    AND (b.current_total, b.total_for, b.total_against)
+        IS DISTINCT FROM (s.total, s.total_for, s.total_against);
+
+    GET DIAGNOSTICS fixed = ROW_COUNT;
+    RETURN fixed;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Backfill existing bets
+SELECT public.reconcile_bet_totals();
@@ -0,0 +1,53 @@
+-- Public bets feed served by a single indexed query instead of an IN (...) list of group ids
+
+-- Public group listings and the feed's group lookup
+CREATE INDEX IF NOT EXISTS groups_is_private_created_at_idx
+    ON public.groups (is_private, created_at DESC);
+
+-- Lets the feed walk bets newest-first and stop at the page limit
+CREATE INDEX IF NOT EXISTS bets_created_at_id_idx
+    ON public.bets (created_at DESC, id DESC);
+
+-- Window scan for the "hot" ranking
+CREATE INDEX IF NOT EXISTS bet_contributions_created_at_idx
+    ON public.bet_contributions (created_at DESC, bet_id);
+
+CREATE OR REPLACE VIEW public.public_bets
+WITH (security_invoker = true) AS
+SELECT
+    b.*,
+    g.name AS group_name
+FROM public.bets b
+JOIN public.groups g ON g.id = b.group_id
+WHERE g.is_private = false;
+
+-- Bets in public groups ranked by recent contribution activity.
+-- hot_score = contributions in the window / (age in hours + 2) ^ 1.5
+-- Rows are returned as jsonb so the function doesn't restate the bets column types.
+CREATE OR REPLACE FUNCTION public.get_hot_public_bets(
+    p_limit integer DEFAULT 20,
+    p_window_hours integer DEFAULT 24
+)
+RETURNS SETOF jsonb AS $$
+    SELECT
+        to_jsonb(ranked.feed)
+            || jsonb_build_object(
+                'recent_contributions', ranked.contributions,
+                'hot_score', ranked.hot_score
+            )
+    FROM (
+        SELECT
+            f AS feed,
+            r.contributions,
+            r.contributions / power(extract(epoch FROM now() - f.created_at) / 3600.0 + 2, 1.5) AS hot_score
+        FROM (
+            SELECT c.bet_id, COUNT(*) AS contributions
+            FROM public.bet_contributions c
+            WHERE c.created_at > now() - make_interval(hours => p_window_hours)
+            GROUP BY c.bet_id
+        ) r
+        JOIN public.public_bets f ON f.id = r.bet_id
+    ) ranked
+    ORDER BY ranked.hot_score DESC, (ranked.feed).id DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,3 @@
+-- Thumbnail variant generated by the upload pipeline, used by proof list views
+ALTER TABLE public.bet_proofs
+ADD COLUMN IF NOT EXISTS proof_thumbnail_url text;
@@ -0,0 +1,55 @@
+-- Content-addressed proof images: one stored blob per distinct upload, shared by reference count.
+-- Objects are stored as <content_hash>.webp and <content_hash>_thumb.webp in the proofs bucket.
+CREATE TABLE IF NOT EXISTS public.proof_blobs (
+    content_hash text PRIMARY KEY,
+    ref_count integer NOT NULL DEFAULT 1 CHECK (ref_count >= 0),
+    created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE public.proof_blobs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can do everything" ON public.proof_blobs
+    FOR ALL
+    TO service_role
+    USING (true)
+    WITH CHECK (true);
+
+-- Take a reference on an already stored blob. Returns no row when the hash is unknown.
+CREATE OR REPLACE FUNCTION public.acquire_proof_blob(p_content_hash text)
+RETURNS SETOF public.proof_blobs AS $$
+    UPDATE public.proof_blobs
+    SET ref_count = ref_count + 1
+    WHERE content_hash = p_content_hash
+    RETURNING *;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- Record a freshly uploaded blob (or a concurrent duplicate of one)
+CREATE OR REPLACE FUNCTION public.register_proof_blob(p_content_hash text)
+RETURNS SETOF public.proof_blobs AS $$
+    INSERT INTO public.proof_blobs (content_hash)
+    VALUES (p_content_hash)
+    ON CONFLICT (content_hash)
+    DO UPDATE SET ref_count = public.proof_blobs.ref_count + 1
+    RETURNING *;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- Drop a reference. Returns the remaining count (the row is deleted at 0, and the
+-- caller then removes the stored objects), or NULL for blobs that were never tracked.
+CREATE OR REPLACE FUNCTION public.release_proof_blob(p_content_hash text)
+RETURNS integer AS $$
+DECLARE
+    remaining integer;
+BEGIN
+    UPDATE public.proof_blobs
+    SET ref_count = ref_count - 1
+    WHERE content_hash = p_content_hash
+    RETURNING ref_count INTO remaining;
+
+    IF remaining IS NOT NULL AND remaining <= 0 THEN
+        DELETE FROM public.proof_blobs WHERE content_hash = p_content_hash;
+        remaining := 0;
+    END IF;
+
+    RETURN remaining;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
@@ -0,0 +1,69 @@
+-- One vote per witness per proof
+CREATE UNIQUE INDEX IF NOT EXISTS proof_verifications_proof_witness_key
+    ON public.proof_verifications (proof_id, witness_id);
+
+-- Record a witness vote and update the proof in the same transaction.
+-- The proof row is locked, so concurrent witnesses are counted one after another
+-- and the status flips to 'verified' exactly once, when required_witnesses is reached.
+-- Errors use PTxxx SQLSTATEs, which PostgREST returns as HTTP status xxx.
+CREATE OR REPLACE FUNCTION public.record_proof_verification(
+    p_proof_id uuid,
+    p_witness_id uuid,
+    p_verified boolean,
+    p_comment text DEFAULT NULL
+)
+RETURNS SETOF public.bet_proofs AS $$
+DECLARE
+    proof public.bet_proofs%ROWTYPE;
+BEGIN
+    SELECT * INTO proof
+    FROM public.bet_proofs
+    WHERE id = p_proof_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Proof not found' USING ERRCODE = 'PT404';
+    END IF;
+
+    IF proof.verification_status <> 'pending' THEN
+        RAISE EXCEPTION 'Proof is no longer awaiting verification' USING ERRCODE = 'PT409';
+    END IF;
+
+    IF proof.verification_deadline IS NOT NULL AND proof.verification_deadline < CURRENT_TIMESTAMP THEN
+        RAISE EXCEPTION 'Verification deadline has passed' USING ERRCODE = 'PT400';
+    END IF;
+
+    -- Only members of the bet's group can witness it
+    IF NOT EXISTS (
+        SELECT 1
+        FROM public.bets b
+        JOIN public.group_members gm ON gm.group_id = b.group_id
+        WHERE b.id = proof.bet_id
+        AND gm.user_id = p_witness_id
+    ) THEN
+        RAISE EXCEPTION 'Only group members can verify this proof' USING ERRCODE = 'PT403';
+    END IF;
+
+    INSERT INTO public.proof_verifications (proof_id, witness_id, verified, comment)
+    VALUES (p_proof_id, p_witness_id, p_verified, p_comment)
+    ON CONFLICT (proof_id, witness_id) DO NOTHING;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'You have already verified this proof' USING ERRCODE = 'PT409';
+    END IF;
+
+    IF p_verified THEN
+        UPDATE public.bet_proofs
+        SET
+            current_witnesses = current_witnesses + 1,
+            verification_status = CASE
+                WHEN current_witnesses + 1 >= required_witnesses THEN 'verified'
+                ELSE verification_status
+            END
+        WHERE id = p_proof_id
+        RETURNING * INTO proof;
+    END IF;
+
+    RETURN NEXT proof;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
@@ -0,0 +1,76 @@
+-- Only rows that can still expire are indexed, so the sweep stays an index range scan
+CREATE INDEX IF NOT EXISTS bet_proofs_pending_deadline_idx
+    ON public.bet_proofs (verification_deadline)
+    WHERE verification_status = 'pending';
+
+CREATE INDEX IF NOT EXISTS bets_open_deadline_idx
+    ON public.bets (verification_deadline)
+    WHERE status IN ('pending', 'active');
+
+-- Expire one batch of overdue proofs and bets.
+-- Every app worker calls this on a timer. The advisory lock lets only one of them
+-- sweep at a time; the others get NULL back and skip this round.
+-- Returns the rows that changed so the caller can notify the people involved.
+CREATE OR REPLACE FUNCTION public.sweep_expired_deadlines(p_batch_size integer DEFAULT 500)
+RETURNS jsonb AS $$
+DECLARE
+    expired_proofs jsonb;
+    expired_bets jsonb;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('sweep_expired_deadlines')) THEN
+        RETURN NULL;
+    END IF;
+
+    WITH due AS (
+        SELECT id
+        FROM public.bet_proofs
+        WHERE verification_status = 'pending'
+        AND verification_deadline < CURRENT_TIMESTAMP
+        ORDER BY verification_deadline
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ), updated AS (
+        UPDATE public.bet_proofs p
+        SET verification_status = 'expired'
+        FROM due
+        WHERE p.id = due.id
+        RETURNING p.id, p.bet_id
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'id', u.id,
+        'bet_id', u.bet_id,
+        'creator_id', b.creator_id
+    )), '[]'::jsonb)
+    INTO expired_proofs
+    FROM updated u
+    JOIN public.bets b ON b.id = u.bet_id;
+
+    WITH due AS (
+        SELECT id
+        FROM public.bets
+        WHERE status IN ('pending', 'active')
+        AND verification_deadline < CURRENT_TIMESTAMP
+        ORDER BY verification_deadline
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ), updated AS (
+        UPDATE public.bets b
+        SET status = 'expired', is_active = false
+        FROM due
+        WHERE b.id = due.id
+        RETURNING b.id, b.creator_id, b.description
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'id', id,
+        'creator_id', creator_id,
+        'description', description
+    )), '[]'::jsonb)
+    INTO expired_bets
+    FROM updated;
+
+    RETURN jsonb_build_object('proofs', expired_proofs, 'bets', expired_bets);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+REVOKE EXECUTE ON FUNCTION public.sweep_expired_deadlines(integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.sweep_expired_deadlines(integer) TO service_role;
@@ -0,0 +1,112 @@
+-- Precomputed premium flag so request paths read a boolean instead of comparing timestamps.
+-- Set whenever premium_expires_at changes, and cleared by expire_premium_subscriptions()
+-- once the period runs out.
+ALTER TABLE public.users
+ADD COLUMN IF NOT EXISTS is_premium boolean NOT NULL DEFAULT false;
+
+CREATE OR REPLACE FUNCTION public.set_user_premium_flag()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.is_premium := NEW.premium_expires_at IS NOT NULL
+        AND NEW.premium_expires_at > CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_user_premium_flag ON public.users;
+CREATE TRIGGER set_user_premium_flag
+    BEFORE INSERT OR UPDATE OF premium_expires_at ON public.users
+    FOR EACH ROW
+    EXECUTE FUNCTION public.set_user_premium_flag();
+
+UPDATE public.users
+SET is_premium = premium_expires_at IS NOT NULL AND premium_expires_at > CURRENT_TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS users_premium_expiry_idx
+    ON public.users (premium_expires_at)
+    WHERE is_premium;
+
+CREATE INDEX IF NOT EXISTS users_auto_renew_idx
+    ON public.users (premium_expires_at)
+    WHERE auto_renew_premium;
+
+-- One row per renewal attempt. The idempotency key names the period being renewed,
+-- so a retried or concurrent job run can never charge or extend the same period twice.
+CREATE TABLE IF NOT EXISTS public.premium_renewals (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id uuid NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+    period_end timestamp with time zone NOT NULL,
+    idempotency_key text NOT NULL UNIQUE,
+    payment_reference text,
+    status text NOT NULL CHECK (status IN ('succeeded', 'failed')),
+    created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE public.premium_renewals ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can do everything" ON public.premium_renewals
+    FOR ALL
+    TO service_role
+    USING (true)
+    WITH CHECK (true);
+
+-- One page of auto-renewing subscriptions that end within p_lead_hours, keyed by user id.
+-- Subscriptions that lapsed more than a period ago are left alone.
+CREATE OR REPLACE FUNCTION public.get_due_premium_renewals(
+    p_limit integer DEFAULT 500,
+    p_after uuid DEFAULT NULL,
+    p_lead_hours integer DEFAULT 24
+)
+RETURNS TABLE (user_id uuid, premium_expires_at timestamp with time zone) AS $$
+    SELECT u.id, u.premium_expires_at
+    FROM public.users u
+    WHERE u.auto_renew_premium
+    AND u.premium_expires_at <= CURRENT_TIMESTAMP + make_interval(hours => p_lead_hours)
+    AND u.premium_expires_at > CURRENT_TIMESTAMP - INTERVAL '30 days'
+    AND (p_after IS NULL OR u.id > p_after)
+    ORDER BY u.id
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Record a page of renewal attempts and extend the successful ones by one period.
+-- Attempts whose idempotency key is already recorded are ignored, and a period is only
+-- extended if it is still the one that was charged for. Returns the renewed user ids.
+CREATE OR REPLACE FUNCTION public.apply_premium_renewals(p_renewals jsonb)
+RETURNS TABLE (user_id uuid) AS $$
+    WITH attempts AS (
+        SELECT *
+        FROM jsonb_to_recordset(p_renewals) AS r(
+            user_id uuid,
+            period_end timestamp with time zone,
+            idempotency_key text,
+            payment_reference text,
+            status text
+        )
+    ), recorded AS (
+        INSERT INTO public.premium_renewals (user_id, period_end, idempotency_key, payment_reference, status)
+        SELECT user_id, period_end, idempotency_key, payment_reference, status
+        FROM attempts
+        ON CONFLICT (idempotency_key) DO NOTHING
+        RETURNING user_id, period_end, status
+    )
+    UPDATE public.users u
+    SET premium_expires_at = r.period_end + INTERVAL '30 days'
+    FROM recorded r
+    WHERE u.id = r.user_id
+    AND r.status = 'succeeded'
+    AND u.premium_expires_at = r.period_end
+    RETURNING u.id AS user_id;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- Clear the flag on subscriptions whose period has ended. Returns the affected user ids.
+CREATE OR REPLACE FUNCTION public.expire_premium_subscriptions()
+RETURNS TABLE (user_id uuid) AS $$
+    UPDATE public.users
+    SET is_premium = false
+    WHERE is_premium
+    AND premium_expires_at <= CURRENT_TIMESTAMP
+    RETURNING id;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- Superseded by the renewal job, which charges before extending
+DROP FUNCTION IF EXISTS public.handle_premium_expiration();
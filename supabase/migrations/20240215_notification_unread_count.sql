@@ -0,0 +1,72 @@
+-- Keep each user's unread notification count on the users row so it is a single-row read
+ALTER TABLE public.users
+ADD COLUMN IF NOT EXISTS unread_notifications integer NOT NULL DEFAULT 0;
+
+-- Statement-level so a multi-row insert (the notification dispatcher) updates each user once
+CREATE OR REPLACE FUNCTION public.handle_notification_unread_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Remove the old rows' unread count (UPDATE and DELETE)
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE public.users u
+        SET unread_notifications = u.unread_notifications - d.unread
+        FROM (
+            SELECT user_id, COUNT(*) AS unread
+            FROM old_rows
+            WHERE NOT COALESCE(read, false)
+            GROUP BY user_id
+        ) d
+        WHERE u.id = d.user_id;
+    END IF;
+
+    -- Add the new rows' unread count (INSERT and UPDATE)
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE public.users u
+        SET unread_notifications = u.unread_notifications + d.unread
+        FROM (
+            SELECT user_id, COUNT(*) AS unread
+            FROM new_rows
+            WHERE NOT COALESCE(read, false)
+            GROUP BY user_id
+        ) d
+        WHERE u.id = d.user_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS on_notifications_inserted ON public.notifications;
+DROP TRIGGER IF EXISTS on_notifications_updated ON public.notifications;
+DROP TRIGGER IF EXISTS on_notifications_deleted ON public.notifications;
+
+CREATE TRIGGER on_notifications_inserted
+    AFTER INSERT ON public.notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.handle_notification_unread_count();
+
+CREATE TRIGGER on_notifications_updated
+    AFTER UPDATE ON public.notifications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.handle_notification_unread_count();
+
+CREATE TRIGGER on_notifications_deleted
+    AFTER DELETE ON public.notifications
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.handle_notification_unread_count();
+
+-- Backfill existing users
+UPDATE public.users u
+SET unread_notifications = COALESCE((
+    SELECT COUNT(*)
+    FROM public.notifications n
+    WHERE n.user_id = u.id
+    AND NOT COALESCE(n.read, false)
+), 0);
+
+-- Stream resume and history reads walk (user_id, created_at, id)
+CREATE INDEX IF NOT EXISTS notifications_user_created_idx
+    ON public.notifications (user_id, created_at DESC, id DESC);
@@ -0,0 +1,96 @@
+-- Create a group, its admin membership and the creator's group count in one transaction.
+-- The creator's row is locked first, so concurrent creates are counted one after another
+-- and cannot both get past the free-tier limit.
+-- Errors use PTxxx SQLSTATEs, which PostgREST returns as HTTP status xxx.
+CREATE OR REPLACE FUNCTION public.create_group_with_admin(
+    p_user_id uuid,
+    p_name text,
+    p_is_private boolean DEFAULT true
+)
+RETURNS SETOF public.groups AS $$
+DECLARE
+    creator public.users%ROWTYPE;
+    new_group public.groups%ROWTYPE;
+BEGIN
+    SELECT * INTO creator
+    FROM public.users
+    WHERE id = p_user_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'User not found' USING ERRCODE = 'PT404';
+    END IF;
+
+    -- Non-premium users can only create 1 group
+    IF NOT COALESCE(creator.premium_expires_at > CURRENT_TIMESTAMP, false)
+        AND creator.groups_created >= 1 THEN
+        RAISE EXCEPTION 'Free users can only create 1 group. Upgrade to premium for unlimited groups!'
+            USING ERRCODE = 'PT403';
+    END IF;
+
+    INSERT INTO public.groups (name, is_private, firebase_uid, created_by, created_at)
+    VALUES (p_name, p_is_private, creator.firebase_uid, creator.id, CURRENT_TIMESTAMP)
+    RETURNING * INTO new_group;
+
+    -- Tell handle_new_group_member the limit and count are handled here
+    PERFORM set_config('hand.creating_group', 'on', true);
+
+    INSERT INTO public.group_members (group_id, user_id, is_admin, joined_at)
+    VALUES (new_group.id, creator.id, true, CURRENT_TIMESTAMP);
+
+    PERFORM set_config('hand.creating_group', 'off', true);
+
+    UPDATE public.users
+    SET groups_created = groups_created + 1
+    WHERE id = creator.id;
+
+    RETURN NEXT new_group;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- The first member of a group becomes its admin. Groups created outside
+-- create_group_with_admin still have the limit enforced and counted here, but groups
+-- created through it are not counted a second time.
+CREATE OR REPLACE FUNCTION public.handle_new_group_member()
+RETURNS TRIGGER AS $$
+DECLARE
+    current_group_count integer;
+    is_premium boolean;
+BEGIN
+    -- If this is the first member of the group (creator)
+    IF NOT EXISTS (
+        SELECT 1
+        FROM public.group_members
+        WHERE group_id = NEW.group_id
+    ) THEN
+        NEW.is_admin := true;
+
+        IF current_setting('hand.creating_group', true) = 'on' THEN
+            RETURN NEW;
+        END IF;
+
+        -- Get current group count and premium status
+        SELECT
+            groups_created,
+            COALESCE(premium_expires_at > CURRENT_TIMESTAMP, false)
+        INTO
+            current_group_count,
+            is_premium
+        FROM public.users
+        WHERE id = NEW.user_id
+        FOR UPDATE;
+
+        -- Non-premium users can only create 1 group
+        IF NOT is_premium AND current_group_count >= 1 THEN
+            RAISE EXCEPTION 'Free users can only create 1 group. Upgrade to premium for unlimited groups!'
+                USING ERRCODE = 'PT403';
+        END IF;
+
+        -- Update the user's groups_created count
+        UPDATE public.users
+        SET groups_created = groups_created + 1
+        WHERE id = NEW.user_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
@@ -0,0 +1,114 @@
+-- Indexes for the lookups every request makes, and RLS policies that evaluate the
+-- caller's memberships once per query instead of once per row.
+-- backend/benchmarks/query_plans.py captures the plans these are meant to produce.
+
+-- get_current_user: users by Firebase UID
+CREATE INDEX IF NOT EXISTS users_firebase_uid_idx
+    ON public.users (firebase_uid);
+
+-- Membership checks and member listings by group
+CREATE INDEX IF NOT EXISTS group_members_group_user_idx
+    ON public.group_members (group_id, user_id);
+
+-- A user's whole membership set (MembershipCache, RLS), answered from the index alone
+CREATE INDEX IF NOT EXISTS group_members_user_idx
+    ON public.group_members (user_id) INCLUDE (group_id, is_admin);
+
+-- join_group; codes are already generated to be unique
+CREATE UNIQUE INDEX IF NOT EXISTS groups_join_code_key
+    ON public.groups (join_code);
+
+-- Public group listing, keyset order
+CREATE INDEX IF NOT EXISTS groups_public_created_id_idx
+    ON public.groups (created_at DESC, id DESC)
+    WHERE NOT is_private;
+
+-- Bets in a group, keyset order
+CREATE INDEX IF NOT EXISTS bets_group_created_id_idx
+    ON public.bets (group_id, created_at DESC, id DESC);
+
+-- Active bets listing
+CREATE INDEX IF NOT EXISTS bets_active_created_id_idx
+    ON public.bets (created_at DESC, id DESC)
+    WHERE status = 'active';
+
+-- Bet history: bets created and contributions made by a user
+CREATE INDEX IF NOT EXISTS bets_creator_created_id_idx
+    ON public.bets (creator_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS bet_contributions_user_created_id_idx
+    ON public.bet_contributions (user_id, created_at DESC, id DESC);
+
+-- Contributions and proofs of one bet (totals reconciliation, realtime lookups, embeds)
+CREATE INDEX IF NOT EXISTS bet_contributions_bet_idx
+    ON public.bet_contributions (bet_id);
+
+CREATE INDEX IF NOT EXISTS bet_proofs_bet_idx
+    ON public.bet_proofs (bet_id);
+
+-- Pending proofs are served by bet_proofs_pending_deadline_idx (20240213)
+-- and notifications by notifications_user_created_idx (20240215).
+
+-- The caller's groups, read with RLS bypassed. Used by the policies below so that
+-- group_members policies don't query group_members under RLS again (which recurses),
+-- and so the set is computed once per statement rather than per row.
+CREATE OR REPLACE FUNCTION public.current_user_group_ids()
+RETURNS SETOF uuid AS $$
+    SELECT group_id
+    FROM public.group_members
+    WHERE user_id = auth.uid();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.current_user_admin_group_ids()
+RETURNS SETOF uuid AS $$
+    SELECT group_id
+    FROM public.group_members
+    WHERE user_id = auth.uid()
+    AND is_admin;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+DROP POLICY IF EXISTS "Enable read access for users" ON public.groups;
+CREATE POLICY "Enable read access for users" ON public.groups
+    FOR SELECT
+    TO authenticated
+    USING (
+        NOT is_private
+        OR id IN (SELECT public.current_user_group_ids())
+    );
+
+DROP POLICY IF EXISTS "Users can view their own groups" ON public.groups;
+CREATE POLICY "Users can view their own groups" ON public.groups
+    FOR SELECT
+    TO authenticated
+    USING (
+        NOT is_private
+        OR firebase_uid = (SELECT auth.uid())::text
+        OR id IN (SELECT public.current_user_group_ids())
+    );
+
+DROP POLICY IF EXISTS "Enable update for group admins" ON public.groups;
+CREATE POLICY "Enable update for group admins" ON public.groups
+    FOR UPDATE
+    TO authenticated
+    USING (id IN (SELECT public.current_user_admin_group_ids()));
+
+DROP POLICY IF EXISTS "Enable delete for group admins" ON public.groups;
+CREATE POLICY "Enable delete for group admins" ON public.groups
+    FOR DELETE
+    TO authenticated
+    USING (id IN (SELECT public.current_user_admin_group_ids()));
+
+DROP POLICY IF EXISTS "Users can view group members" ON public.group_members;
+CREATE POLICY "Users can view group members" ON public.group_members
+    FOR SELECT
+    TO authenticated
+    USING (
+        group_id IN (SELECT public.current_user_group_ids())
+        OR group_id IN (SELECT id FROM public.groups WHERE NOT is_private)
+    );
+
+DROP POLICY IF EXISTS "Group admins can manage members" ON public.group_members;
+CREATE POLICY "Group admins can manage members" ON public.group_members
+    FOR ALL
+    TO authenticated
+    USING (group_id IN (SELECT public.current_user_admin_group_ids()));
@@ -0,0 +1,30 @@
+-- Time-limited leases for periodic jobs that must run once per interval cluster-wide.
+-- Every app worker schedules the job; the first to take the lease runs it and the rest
+-- skip until the lease runs out. Unlike the sweep's advisory lock this outlives a
+-- single transaction, so it can cover a job made of several calls.
+CREATE TABLE IF NOT EXISTS public.job_leases (
+    name text PRIMARY KEY,
+    expires_at timestamp with time zone NOT NULL
+);
+
+ALTER TABLE public.job_leases ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can do everything" ON public.job_leases
+    FOR ALL
+    TO service_role
+    USING (true)
+    WITH CHECK (true);
+
+-- True if the caller now holds the lease for p_ttl_seconds, false if another does
+CREATE OR REPLACE FUNCTION public.try_acquire_job_lease(p_name text, p_ttl_seconds integer)
+RETURNS boolean AS $$
+    WITH acquired AS (
+        INSERT INTO public.job_leases AS l (name, expires_at)
+        VALUES (p_name, CURRENT_TIMESTAMP + make_interval(secs => p_ttl_seconds))
+        ON CONFLICT (name) DO UPDATE
+        SET expires_at = EXCLUDED.expires_at
+        WHERE l.expires_at <= CURRENT_TIMESTAMP
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM acquired);
+$$ LANGUAGE sql VOLATILE SECURITY DEFINER;
@@ -0,0 +1,20 @@
+-- The SSE endpoints subscribe to postgres_changes on these tables, and Supabase
+-- Realtime only emits changes for tables in the supabase_realtime publication.
+DO $$
+DECLARE
+    t text;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime') THEN
+        CREATE PUBLICATION supabase_realtime;
+    END IF;
+
+    FOREACH t IN ARRAY ARRAY['bets', 'bet_contributions', 'notifications'] LOOP
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_publication_tables
+            WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = t
+        ) THEN
+            EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE public.%I', t);
+        END IF;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,25 @@
+-- calculate_users_stats as one grouped aggregate over the requested ids, instead of
+-- running calculate_user_stats once per id. For each user:
+--   total_bets: distinct bets they contributed to
+--   wins: those of them where they backed the 'for' side and a proof was verified
+CREATE OR REPLACE FUNCTION public.calculate_users_stats(user_ids uuid[])
+RETURNS TABLE (
+    user_id uuid,
+    total_bets integer,
+    wins integer
+) AS $$
+    SELECT
+        ids.id,
+        COUNT(DISTINCT c.bet_id)::integer,
+        (COUNT(DISTINCT c.bet_id) FILTER (
+            WHERE COALESCE(c.bet_side, 'for') = 'for' AND verified.bet_id IS NOT NULL
+        ))::integer
+    FROM unnest(user_ids) AS ids(id)
+    LEFT JOIN public.bet_contributions c ON c.user_id = ids.id
+    LEFT JOIN (
+        SELECT DISTINCT bet_id
+        FROM public.bet_proofs
+        WHERE verification_status = 'verified'
+    ) AS verified ON verified.bet_id = c.bet_id
+    GROUP BY ids.id;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
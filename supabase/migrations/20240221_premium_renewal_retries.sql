@@ -0,0 +1,68 @@
+-- Retry failed renewals a bounded number of times. Each attempt on a period gets its
+-- own idempotency key (the attempt number is part of it), so a failure recorded under
+-- attempt 1 no longer blocks attempt 2. Periods that have used up their attempts drop
+-- out of the candidate query instead of being selected on every run.
+ALTER TABLE public.premium_renewals
+ADD COLUMN IF NOT EXISTS attempt integer NOT NULL DEFAULT 1;
+
+CREATE INDEX IF NOT EXISTS premium_renewals_user_period_idx
+    ON public.premium_renewals (user_id, period_end)
+    WHERE status = 'failed';
+
+DROP FUNCTION IF EXISTS public.get_due_premium_renewals(integer, uuid, integer);
+
+-- One page of auto-renewing subscriptions that end within p_lead_hours, keyed by user id,
+-- with the number of the attempt to make next.
+CREATE OR REPLACE FUNCTION public.get_due_premium_renewals(
+    p_limit integer DEFAULT 500,
+    p_after uuid DEFAULT NULL,
+    p_lead_hours integer DEFAULT 24,
+    p_max_attempts integer DEFAULT 3
+)
+RETURNS TABLE (user_id uuid, premium_expires_at timestamp with time zone, attempt integer) AS $$
+    SELECT u.id, u.premium_expires_at, failed.count + 1
+    FROM public.users u
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*)::integer AS count
+        FROM public.premium_renewals r
+        WHERE r.user_id = u.id
+        AND r.period_end = u.premium_expires_at
+        AND r.status = 'failed'
+    ) AS failed
+    WHERE u.auto_renew_premium
+    AND u.premium_expires_at <= CURRENT_TIMESTAMP + make_interval(hours => p_lead_hours)
+    AND u.premium_expires_at > CURRENT_TIMESTAMP - INTERVAL '30 days'
+    AND failed.count < p_max_attempts
+    AND (p_after IS NULL OR u.id > p_after)
+    ORDER BY u.id
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- As before, now recording the attempt number
+CREATE OR REPLACE FUNCTION public.apply_premium_renewals(p_renewals jsonb)
+RETURNS TABLE (user_id uuid) AS $$
+    WITH attempts AS (
+        SELECT *
+        FROM jsonb_to_recordset(p_renewals) AS r(
+            user_id uuid,
+            period_end timestamp with time zone,
+            attempt integer,
+            idempotency_key text,
+            payment_reference text,
+            status text
+        )
+    ), recorded AS (
+        INSERT INTO public.premium_renewals (user_id, period_end, attempt, idempotency_key, payment_reference, status)
+        SELECT user_id, period_end, COALESCE(attempt, 1), idempotency_key, payment_reference, status
+        FROM attempts
+        ON CONFLICT (idempotency_key) DO NOTHING
+        RETURNING user_id, period_end, status
+    )
+    UPDATE public.users u
+    SET premium_expires_at = r.period_end + INTERVAL '30 days'
+    FROM recorded r
+    WHERE u.id = r.user_id
+    AND r.status = 'succeeded'
+    AND u.premium_expires_at = r.period_end
+    RETURNING u.id AS user_id;
+$$ LANGUAGE sql SECURITY DEFINER;
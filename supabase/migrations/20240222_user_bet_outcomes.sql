@@ -0,0 +1,97 @@
+-- One definition of a user's betting record, shared by calculate_user_stats (the
+-- analytics route) and calculate_users_stats (user profiles and listings), which
+-- replaced calculate_user_stats with their own semantics until now.
+--
+-- A bet the user contributed to is decided once it has a verified proof (the 'for'
+-- side wins) or has expired without one (the 'against' side wins). The user wins it
+-- if they backed the winning side and loses it if they backed the losing one.
+CREATE OR REPLACE FUNCTION public.user_bet_outcomes(user_ids uuid[])
+RETURNS TABLE (
+    user_id uuid,
+    bet_id uuid,
+    reward_type text,
+    target_quantity integer,
+    won boolean,
+    lost boolean
+) AS $$
+    WITH backed AS (
+        SELECT
+            c.user_id,
+            c.bet_id,
+            bool_or(COALESCE(c.bet_side, 'for') = 'for') AS backed_for,
+            bool_or(c.bet_side = 'against') AS backed_against
+        FROM public.bet_contributions c
+        WHERE c.user_id = ANY(user_ids)
+        GROUP BY c.user_id, c.bet_id
+    ), decided AS (
+        SELECT
+            backed.*,
+            b.reward_type,
+            b.target_quantity,
+            EXISTS (
+                SELECT 1 FROM public.bet_proofs p
+                WHERE p.bet_id = b.id AND p.verification_status = 'verified'
+            ) AS verified,
+            b.status = 'expired' AS expired
+        FROM backed
+        JOIN public.bets b ON b.id = backed.bet_id
+    )
+    SELECT
+        user_id,
+        bet_id,
+        reward_type,
+        target_quantity,
+        (backed_for AND verified) OR (backed_against AND expired AND NOT verified),
+        (backed_for AND expired AND NOT verified) OR (backed_against AND verified)
+    FROM decided;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+CREATE OR REPLACE FUNCTION public.calculate_users_stats(user_ids uuid[])
+RETURNS TABLE (
+    user_id uuid,
+    total_bets integer,
+    wins integer
+) AS $$
+    SELECT
+        ids.id,
+        COUNT(o.bet_id)::integer,
+        (COUNT(o.bet_id) FILTER (WHERE o.won))::integer
+    FROM unnest(user_ids) AS ids(id)
+    LEFT JOIN public.user_bet_outcomes(user_ids) o ON o.user_id = ids.id
+    GROUP BY ids.id;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- The existing function's return type is not known to these migrations, so replace it
+DROP FUNCTION IF EXISTS public.calculate_user_stats(uuid);
+
+-- Shape of the analytics UserStats model; total_rewards_won sums the target quantity
+-- of won bets per reward type
+CREATE FUNCTION public.calculate_user_stats(user_id uuid)
+RETURNS json AS $$
+    WITH outcomes AS (
+        SELECT * FROM public.user_bet_outcomes(ARRAY[$1])
+    ), totals AS (
+        SELECT
+            COUNT(*)::integer AS total_bets,
+            (COUNT(*) FILTER (WHERE won))::integer AS wins,
+            (COUNT(*) FILTER (WHERE lost))::integer AS losses
+        FROM outcomes
+    )
+    SELECT json_build_object(
+        'total_bets', totals.total_bets,
+        'wins', totals.wins,
+        'losses', totals.losses,
+        'win_rate', CASE WHEN totals.wins + totals.losses = 0 THEN 0
+                         ELSE totals.wins::float / (totals.wins + totals.losses) END,
+        'total_rewards_won', COALESCE((
+            SELECT json_object_agg(reward_type, quantity)
+            FROM (
+                SELECT reward_type, SUM(target_quantity)::integer AS quantity
+                FROM outcomes
+                WHERE won AND reward_type IS NOT NULL
+                GROUP BY reward_type
+            ) AS rewards
+        ), '{}'::json)
+    )
+    FROM totals;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
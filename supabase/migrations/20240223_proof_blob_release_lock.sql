@@ -0,0 +1,31 @@
+-- release_proof_blob decides under the row lock whether the caller may delete the
+-- stored objects, and returns that decision rather than the remaining count.
+-- acquire_proof_blob's UPDATE waits on the same lock, so a reference taken while a
+-- release is in flight is either counted before the decision or sees no row and
+-- uploads the image again.
+DROP FUNCTION IF EXISTS public.release_proof_blob(text);
+
+CREATE FUNCTION public.release_proof_blob(p_content_hash text)
+RETURNS boolean AS $$
+DECLARE
+    remaining integer;
+BEGIN
+    SELECT ref_count - 1 INTO remaining
+    FROM public.proof_blobs
+    WHERE content_hash = p_content_hash
+    FOR UPDATE;
+
+    -- Never tracked (stored before deduplication): its objects belong to this caller
+    IF NOT FOUND THEN
+        RETURN true;
+    END IF;
+
+    IF remaining > 0 THEN
+        UPDATE public.proof_blobs SET ref_count = remaining WHERE content_hash = p_content_hash;
+        RETURN false;
+    END IF;
+
+    DELETE FROM public.proof_blobs WHERE content_hash = p_content_hash;
+    RETURN true;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;